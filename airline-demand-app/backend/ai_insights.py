@@ -1,29 +1,174 @@
 import os
+import json
+import hashlib
+import threading
+import time
+from concurrent.futures import Future
+import numpy as np
 import requests
-import pandas as pd
+from requests.adapters import HTTPAdapter
 from dotenv import load_dotenv
+from cache import AnalyticsCache
+from metrics import count, timer
+from processor import SAMPLE_COLUMNS
+from summary import load_summary, merge_summary
 
 load_dotenv()
 
-GEMINI_API_URL = "https://generativelanguage.googleapis.com/v1beta/models/gemini-2.0-flash:generateContent"
+# Override GEMINI_API_URL to point at gemini_stub.py for offline runs
+GEMINI_API_URL = os.getenv("GEMINI_API_URL", "https://generativelanguage.googleapis.com/v1beta/models/gemini-2.0-flash:generateContent")
+AI_CACHE_DIR = os.getenv("AI_CACHE_DIR", os.path.join(os.path.dirname(__file__), '.ai_cache'))
 
-def get_ai_insights_from_csv(csv_path, max_rows=200):
+# Approximate prompt size; the summary is trimmed to fit (about 4 characters per token)
+AI_PROMPT_TOKENS = int(os.getenv("AI_PROMPT_TOKENS", "1500"))
+CHARS_PER_TOKEN = 4
+
+# After a failed generation (no key, API error) the same prompt isn't retried for this long, doubling on each
+# further failure up to AI_RETRY_MAX_SECONDS, so dashboard polls don't each trigger another call
+AI_RETRY_SECONDS = float(os.getenv("AI_RETRY_SECONDS", "60"))
+AI_RETRY_MAX_SECONDS = float(os.getenv("AI_RETRY_MAX_SECONDS", "3600"))
+
+_prompt_cache = AnalyticsCache(max_entries=4)
+
+# One pooled session, so repeated calls reuse the TLS connection instead of reconnecting each time
+_session = requests.Session()
+_session.mount("https://", HTTPAdapter(pool_connections=1, pool_maxsize=4))
+_session.mount("http://", HTTPAdapter(pool_connections=1, pool_maxsize=4))
+
+# Prompt key -> Future of the Gemini call in progress for it, so a burst of requests triggers one call
+_in_flight = {}
+_in_flight_lock = threading.Lock()
+# Prompt key -> (retry after, failures in a row, last error text): a negative cache for failed generations
+_failures = {}
+
+PROMPT_INSTRUCTIONS = (
+    "You are an expert airline data analyst. Below is a statistical summary computed from a full airline flight "
+    "dataset, followed by a small sample of flights. Using it, provide:\n"
+    "1. Three insightful bullet points (in markdown, with bolded keywords) about demand trends, pricing changes, and popular routes.\n"
+    "2. A markdown table summarizing the top 3 airlines by average price (columns: Airline, Avg Price).\n"
+    "Respond in markdown format only.\n"
+)
+
+def estimate_tokens(text):
+    return len(text) // CHARS_PER_TOKEN + 1
+
+def _price_quantiles(counts, quantiles=(0.1, 0.25, 0.5, 0.75, 0.9)):
+    """Quantiles of a {value: count} histogram, as exact as the counts themselves."""
+    if not counts:
+        return {}
+    values = np.array([float(v) for v in counts])
+    weights = np.array(list(counts.values()), dtype=np.int64)
+    order = np.argsort(values)
+    cumulative = np.cumsum(weights[order])
+    return {q: values[order][np.searchsorted(cumulative, q * cumulative[-1])] for q in quantiles}
+
+def _fmt(value):
+    return f"{value:.0f}" if isinstance(value, float) else str(value)
+
+def _section(title, columns, rows):
+    return [f"\n## {title}", ",".join(columns)] + [",".join(_fmt(v) for v in row) for row in rows]
+
+def prompt_sections(partial):
+    """Prompt sections, most important first, from merged summary partials (see processor.merge_partials)."""
+    days = sorted(partial['days'])
+    quantiles = _price_quantiles(partial['prices'])
+    overview = ["\n## Overview", f"flights: {partial['rows']}"]
+    if days:
+        overview.append(f"departure dates: {days[0]} to {days[-1]} ({len(days)} days)")
+    if quantiles:
+        overview.append("price quantiles (scraped currency): " + ", ".join(f"p{int(q * 100)}={v:.0f}" for q, v in quantiles.items()))
+    overview.append("stops: " + ", ".join(f"{k}={v}" for k, v in sorted(partial['stops'].items(), key=lambda kv: -kv[1])))
+    airlines = sorted(partial['airlines'].items(), key=lambda kv: -kv[1].get('count', 0))
+    per_airline = _section("Per airline", ["airline", "flights", "avg_price", "min_price", "max_price", "avg_co2_kg"], [
+        (a, int(s['count']),
+         s['price_sum'] / s['price_count'] if s.get('price_count') else '',
+         s.get('price_min', ''), s.get('price_max', ''),
+         s['co2_sum'] / s['co2_count'] if s.get('co2_count') else '')
+        for a, s in airlines])
+    routes = _section("Top routes", ["route", "flights"],
+                      sorted(partial['routes'].items(), key=lambda kv: -kv[1])[:10]) if partial['routes'] else []
+    day_rows = []
+    for day in days:
+        prices = partial['day_prices'].get(day, {})
+        avg = prices['price_sum'] / prices['price_count'] if prices.get('price_count') else ''
+        day_rows.append((day, partial['days'][day], avg, prices.get('price_min', '')))
+    per_day = _section("Per departure date", ["date", "flights", "avg_price", "min_price"], day_rows)
+    # Round-robin over airlines so a truncated sample still covers as many carriers as possible
+    samples = list(partial['sample'].values())
+    sample_rows = [rows[i] for i in range(max(map(len, samples), default=0)) for rows in samples if i < len(rows)]
+    columns = [c for c in SAMPLE_COLUMNS if sample_rows and c in sample_rows[0]]
+    sample = _section("Sample flights (stratified by airline)", columns,
+                      [[('' if row.get(c) is None else row[c]) for c in columns] for row in sample_rows])
+    return [overview, per_airline, routes, per_day, sample]
+
+def compose_prompt(partial, token_budget=None):
+    """Instructions plus as much of the summary as fits in token_budget; sections are added in priority
+    order and the first one that doesn't fit is cut off row by row."""
+    budget = (token_budget or AI_PROMPT_TOKENS) * CHARS_PER_TOKEN
+    lines = [PROMPT_INSTRUCTIONS]
+    used = len(PROMPT_INSTRUCTIONS)
+    for section in prompt_sections(partial):
+        for i, line in enumerate(section):
+            if used + len(line) + 1 > budget:
+                # Keep a title/header only if at least one row made it in
+                if i <= 2:
+                    del lines[len(lines) - i:]
+                return "\n".join(lines)
+            lines.append(line)
+            used += len(line) + 1
+    return "\n".join(lines)
+
+def build_prompt(csv_path, token_budget=None):
+    """Prompt for the dataset at csv_path, built from the full-data summary rather than raw rows.
+    Memoized per data version, since /api/analyze looks up the cached insight on every call."""
+    abs_path = os.path.abspath(os.path.join(os.path.dirname(__file__), '..', csv_path))
+    token_budget = token_budget or AI_PROMPT_TOKENS
+    def compute(path):
+        units = load_summary(path)['units']
+        with timer("ai_prompt"):
+            return compose_prompt(merge_summary(units), token_budget)
+    return _prompt_cache.get_or_compute(abs_path, compute, token_budget)
+
+def prompt_key(prompt):
+    return hashlib.sha256(prompt.encode('utf-8')).hexdigest()
+
+def _cache_file(key):
+    return os.path.join(AI_CACHE_DIR, f"{key}.json")
+
+def _read_cache(key):
+    try:
+        with open(_cache_file(key), encoding='utf-8') as f:
+            return json.load(f)["insight"]
+    except (OSError, ValueError, KeyError):
+        return None
+
+def _write_cache(key, insight):
+    os.makedirs(AI_CACHE_DIR, exist_ok=True)
+    tmp_path = _cache_file(key) + ".tmp"
+    with open(tmp_path, 'w', encoding='utf-8') as f:
+        json.dump({"insight": insight}, f)
+    os.replace(tmp_path, _cache_file(key))
+
+def get_cached_ai_insights(csv_path, token_budget=None):
+    """Return the stored insight for this dataset's prompt, or None if it hasn't been generated yet."""
+    try:
+        return _read_cache(prompt_key(build_prompt(csv_path, token_budget)))
+    except Exception:
+        return None
+
+def cached_insight_key(csv_path, token_budget=None):
+    """Prompt key of this dataset's stored insight (a version for HTTP validators), or None if there's none yet."""
+    try:
+        key = prompt_key(build_prompt(csv_path, token_budget))
+    except Exception:
+        return None
+    return key if os.path.exists(_cache_file(key)) else None
+
+def request_gemini(prompt):
+    """Send the prompt to Gemini. Returns (text, ok); only ok responses are worth caching."""
     api_key = os.getenv("GEMINI_API_KEY")
     if not api_key:
-        return "Gemini API key not set."
-    try:
-        abs_path = os.path.abspath(os.path.join(os.path.dirname(__file__), '..', csv_path))
-        df = pd.read_csv(abs_path, nrows=max_rows)
-        csv_content = df.to_csv(index=False)
-    except Exception as e:
-        return f"CSV read error: {e}"
-    prompt = (
-        "You are an expert airline data analyst. Analyze the following airline flight CSV data and provide:\n"
-        "1. Three insightful bullet points (in markdown, with bolded keywords) about demand trends, pricing changes, and popular routes.\n"
-        "2. A markdown table summarizing the top 3 airlines by average price (columns: Airline, Avg Price).\n"
-        "Respond in markdown format only.\n\n"
-        + csv_content
-    )
+        return "Gemini API key not set.", False
     headers = {
         "Content-Type": "application/json",
         "X-goog-api-key": api_key
@@ -36,15 +181,86 @@ def get_ai_insights_from_csv(csv_path, max_rows=200):
         ]
     }
     try:
-        resp = requests.post(GEMINI_API_URL, headers=headers, json=data, timeout=60)
+        with timer("gemini_request"):
+            resp = _session.post(GEMINI_API_URL, headers=headers, json=data, timeout=60)
         resp.raise_for_status()
         result = resp.json()
         candidates = result.get("candidates", [])
         if candidates and "content" in candidates[0] and "parts" in candidates[0]["content"]:
-            return candidates[0]["content"]["parts"][0]["text"]
-        return f"AI did not return a valid response: {result}"
+            count("gemini_requests", outcome="ok")
+            return candidates[0]["content"]["parts"][0]["text"], True
+        count("gemini_requests", outcome="invalid")
+        return f"AI did not return a valid response: {result}", False
     except Exception as e:
-        return f"AI insight error: {e}"
+        count("gemini_requests", outcome="error")
+        return f"AI insight error: {e}", False
+
+def get_ai_insights_from_csv(csv_path, token_budget=None):
+    """Return the insight for this dataset, calling Gemini only when no cached answer exists."""
+    try:
+        prompt = build_prompt(csv_path, token_budget)
+    except Exception as e:
+        return f"CSV read error: {e}"
+    key = prompt_key(prompt)
+    cached = _read_cache(key)
+    count("ai_insight_lookups", result="miss" if cached is None else "hit")
+    if cached is not None:
+        return cached
+    with _in_flight_lock:
+        failure = _failures.get(key)
+    if failure is not None and time.time() < failure[0]:
+        count("ai_insight_lookups", result="backoff")
+        return failure[2]
+    return _generate(key, prompt)
+
+def _record_failure(key, message):
+    with _in_flight_lock:
+        now = time.time()
+        # Entries for older data versions are never looked up again once their backoff has passed
+        for stale in [k for k, (retry_at, _, _) in _failures.items() if retry_at <= now and k != key]:
+            del _failures[stale]
+        failures = _failures[key][1] + 1 if key in _failures else 1
+        delay = min(AI_RETRY_SECONDS * 2 ** (failures - 1), AI_RETRY_MAX_SECONDS)
+        _failures[key] = (now + delay, failures, message)
+
+def _generate(key, prompt):
+    """Call Gemini for prompt, unless a call for it is already running: then wait for that one's answer."""
+    with _in_flight_lock:
+        pending = _in_flight.get(key)
+        if pending is None:
+            future = _in_flight[key] = Future()
+    if pending is not None:
+        count("ai_insight_lookups", result="coalesced")
+        return pending.result()
+    try:
+        insight, ok = request_gemini(prompt)
+        if ok:
+            _write_cache(key, insight)
+            with _in_flight_lock:
+                _failures.pop(key, None)
+        else:
+            _record_failure(key, insight)
+        future.set_result(insight)
+        return insight
+    except BaseException as e:
+        future.set_exception(e)
+        raise
+    finally:
+        with _in_flight_lock:
+            del _in_flight[key]
+
+def refresh_ai_insights(csv_path, token_budget=None):
+    """Background-task entry point: fill the cache for this CSV unless it's cached, already being fetched, or
+    failed recently (see AI_RETRY_SECONDS)."""
+    try:
+        key = prompt_key(build_prompt(csv_path, token_budget))
+    except Exception:
+        return
+    with _in_flight_lock:
+        if key in _in_flight or (key in _failures and time.time() < _failures[key][0]):
+            return
+    if _read_cache(key) is None:
+        get_ai_insights_from_csv(csv_path, token_budget)
 #Debug- HERE!!!
 #if __name__ == "__main__":
 #    print(get_ai_insights_from_csv('scraper/csv_output/flight_data.csv'))
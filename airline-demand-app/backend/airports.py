@@ -0,0 +1,128 @@
+import bisect
+import heapq
+import os
+import re
+from collections import Counter
+
+import pandas as pd
+
+AIRPORTS_PATH = os.getenv("AIRPORTS_CSV", os.path.join(os.path.dirname(__file__), '../data/airport-codes.csv'))
+IATA_CODE = re.compile(r'^[A-Z]{3}$')
+
+# Column names accepted for each field: the datahub/OurAirports "airport-codes" layout, or a plain one
+COLUMNS = {
+    'code': ('iata_code', 'iata', 'code'),
+    'name': ('name', 'airport'),
+    'city': ('municipality', 'city'),
+    'country': ('iso_country', 'country'),
+    'type': ('type',),
+}
+# Larger airports first when several match equally well
+TYPE_RANK = {'large_airport': 0, 'medium_airport': 1, 'small_airport': 2}
+# Ranking of how a query matched: the code itself, the start of the code, then a city or name word
+EXACT, CODE_PREFIX, CITY_PREFIX, NAME_PREFIX = range(4)
+# Name words shared by more airports than this ("airport", "international") aren't indexed: they'd match
+# most of the table without narrowing anything down
+COMMON_WORD_SHARE = 0.05
+# Shorter queries only match codes; one letter would otherwise select a large slice of every word
+MIN_WORD_PREFIX = 2
+
+
+def _words(text):
+    return [w for w in re.split(r'[^0-9a-z]+', text.lower()) if w]
+
+
+class AirportIndex:
+    """Airports with an IATA code, searchable by code, city or name prefix.
+
+    Everything lives in sorted parallel lists: `codes` for the codes themselves and `words`/`word_ids`
+    for every lowercase word of each city and name. A prefix query is two bisects over one list, so a
+    lookup costs O(log n + matches) with no per-query scan of the table. Only the longest word of a
+    query goes through the index; the others filter the airports it found.
+    """
+
+    def __init__(self, airports):
+        # Sorted by code, so an airport's position in `airports` is also its position in `codes`
+        self.airports = sorted(airports, key=lambda a: a['code'])
+        self.codes = [a['code'] for a in self.airports]
+        self._ids = {code: i for i, code in enumerate(self.codes)}
+        self._city_words = [_words(a['city']) for a in self.airports]
+        self._name_words = [_words(a['name']) for a in self.airports]
+        frequency = Counter(w for words in self._name_words for w in set(words))
+        limit = max(50, COMMON_WORD_SHARE * len(self.airports))
+        self.common = {w for w, n in frequency.items() if n > limit}
+        words = sorted({(w, kind, i) for i in range(len(self.airports))
+                        for kind, field_words in ((CITY_PREFIX, self._city_words), (NAME_PREFIX, self._name_words))
+                        for w in field_words[i] if kind == CITY_PREFIX or w not in self.common})
+        self.words = [w for w, _, _ in words]
+        self.word_kinds = [kind for _, kind, _ in words]
+        self.word_ids = [i for _, _, i in words]
+
+    @classmethod
+    def load(cls, path=AIRPORTS_PATH):
+        """Read a CSV of airports; rows without a three-letter IATA code and closed airports are skipped.
+        A missing or empty file gives an empty index."""
+        try:
+            df = pd.read_csv(path, dtype=str, keep_default_na=False, comment='#')
+        except (OSError, pd.errors.EmptyDataError):
+            return cls([])
+        lower = {c.lower(): c for c in df.columns}
+        fields = {field: next((lower[c] for c in names if c in lower), None) for field, names in COLUMNS.items()}
+        if fields['code'] is None:
+            return cls([])
+        table = pd.DataFrame({field: df[column].str.strip() if column else '' for field, column in fields.items()},
+                             index=df.index)
+        table['code'] = table['code'].str.upper()
+        table = table[table['code'].str.fullmatch(r'[A-Z]{3}') & (table['type'] != 'closed')]
+        return cls(table.drop_duplicates('code').to_dict(orient='records'))
+
+    def __len__(self):
+        return len(self.airports)
+
+    def __contains__(self, code):
+        return code in self._ids
+
+    def get(self, code):
+        i = self._ids.get(code)
+        return None if i is None else self.airports[i]
+
+    @staticmethod
+    def _prefix_range(keys, prefix):
+        start = bisect.bisect_left(keys, prefix)
+        return start, bisect.bisect_left(keys, prefix + '\uffff', start)
+
+    def search(self, query, limit=10):
+        """Airports matching query, best first: exact code, code prefix, then city and name word prefixes."""
+        query = query.strip()
+        if not query:
+            return []
+        best = {}
+        code_query = query.upper()
+        start, end = self._prefix_range(self.codes, code_query)
+        for i in range(start, end):
+            best[i] = EXACT if self.codes[i] == code_query else CODE_PREFIX
+        # Every word of the query has to start a word of the airport ("new york" -> New York JFK)
+        words = sorted((w for w in _words(query) if w not in self.common), key=len, reverse=True)
+        if words and len(words[0]) >= MIN_WORD_PREFIX:
+            start, end = self._prefix_range(self.words, words[0])
+            matched = {}
+            for j in range(start, end):
+                i = self.word_ids[j]
+                matched[i] = min(matched.get(i, NAME_PREFIX), self.word_kinds[j])
+            for word in words[1:]:
+                matched = {i: kind for i, kind in matched.items()
+                           if any(w.startswith(word) for w in self._city_words[i] + self._name_words[i])}
+            for i, kind in matched.items():
+                best[i] = min(best.get(i, kind), kind)
+        ranked = heapq.nsmallest(limit, best, key=lambda i: (best[i], TYPE_RANK.get(self.airports[i]['type'], 3), i))
+        return [self.airports[i] for i in ranked]
+
+
+def validate_code(code, index):
+    """Normalized IATA code, or ValueError if it isn't one; checked against index when it has data."""
+    code = code.strip().upper()
+    if not IATA_CODE.match(code):
+        raise ValueError(f"'{code}' is not a three-letter IATA airport code")
+    if len(index) and code not in index:
+        raise ValueError(f"Unknown airport code '{code}'")
+    return code
@@ -0,0 +1,123 @@
+import asyncio
+import os
+import threading
+from collections import OrderedDict
+from concurrent.futures import Future
+
+
+def file_fingerprint(path):
+    """Identify a data file by (absolute path, mtime, size); any rewrite by the scraper changes it.
+    For a store directory, the newest mtime and the total size/count of the files inside are used."""
+    if os.path.isdir(path):
+        latest, total, count = 0, 0, 0
+        for root, _, files in os.walk(path):
+            for name in files:
+                try:
+                    st = os.stat(os.path.join(root, name))
+                except FileNotFoundError:  # replaced by the scraper mid-walk
+                    continue
+                latest, total, count = max(latest, st.st_mtime_ns), total + st.st_size, count + 1
+        return (os.path.abspath(path), latest, (total, count))
+    st = os.stat(path)
+    return (os.path.abspath(path), st.st_mtime_ns, st.st_size)
+
+
+class AnalyticsCache:
+    """Small LRU cache of computed analytics, keyed on the fingerprint of the file they came from."""
+
+    def __init__(self, max_entries=4):
+        self.max_entries = max(1, max_entries)
+        self._entries = OrderedDict()
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+        self.coalesced = 0
+        self._pending = {}  # key -> Future of a computation in progress
+
+    def _claim(self, key):
+        """(True, value) on a hit. Otherwise (False, future): the caller that created the future must
+        compute and _settle it; later callers with the same key get that same future and wait on it."""
+        with self._lock:
+            if key in self._entries:
+                self._entries.move_to_end(key)
+                self.hits += 1
+                return True, self._entries[key]
+            pending = self._pending.get(key)
+            if pending is not None:
+                self.coalesced += 1
+                return False, pending
+            self.misses += 1
+            self._pending[key] = Future()
+            return False, None
+
+    def _settle(self, key, value=None, error=None):
+        with self._lock:
+            future = self._pending.pop(key)
+            if error is None:
+                # Results for older versions of the same file can never be hit again
+                for stale in [k for k in self._entries if k[0] == key[0] and k[1:3] != key[1:3]]:
+                    del self._entries[stale]
+                self._entries[key] = value
+                while len(self._entries) > self.max_entries:
+                    self._entries.popitem(last=False)
+                    self.evictions += 1
+        if error is None:
+            future.set_result(value)
+        else:
+            future.set_exception(error)
+
+    def get_or_compute(self, path, compute, *extra_key):
+        """Return the cached result for this version of `path`, calling compute(path) on a miss.
+        Concurrent misses for the same key share one call instead of each computing it."""
+        key = file_fingerprint(path) + extra_key
+        hit, value = self._claim(key)
+        if hit:
+            return value
+        if value is not None:
+            return value.result()
+        try:
+            value = compute(path)
+        except BaseException as e:
+            self._settle(key, error=e)
+            raise
+        self._settle(key, value)
+        return value
+
+    async def get_or_compute_async(self, path, compute, *extra_key):
+        """get_or_compute for an event loop: compute(path) returns an awaitable (e.g. work handed to an
+        executor), and callers waiting on someone else's computation don't hold a thread."""
+        key = file_fingerprint(path) + extra_key
+        hit, value = self._claim(key)
+        if hit:
+            return value
+        if value is not None:
+            return await asyncio.wrap_future(value)
+        try:
+            value = await compute(path)
+        except BaseException as e:
+            self._settle(key, error=e)
+            raise
+        self._settle(key, value)
+        return value
+
+    def invalidate(self, path=None):
+        """Drop cached results for `path`, or everything when no path is given."""
+        with self._lock:
+            if path is None:
+                self._entries.clear()
+                return
+            abs_path = os.path.abspath(path)
+            for key in [k for k in self._entries if k[0] == abs_path]:
+                del self._entries[key]
+
+    def stats(self):
+        with self._lock:
+            return {
+                "entries": len(self._entries),
+                "max_entries": self.max_entries,
+                "hits": self.hits,
+                "misses": self.misses,
+                "evictions": self.evictions,
+                "coalesced": self.coalesced,
+            }
@@ -0,0 +1,51 @@
+# Local stand-in for the Gemini generateContent endpoint, for running the backend offline.
+# Usage: python gemini_stub.py --port 8090 --delay 2
+# then start the backend with GEMINI_API_URL=http://127.0.0.1:8090/ and any GEMINI_API_KEY.
+
+import argparse
+import json
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+STUB_INSIGHT = (
+    "- **Demand** is concentrated on morning departures.\n"
+    "- **Prices** rise sharply in the last week before departure.\n"
+    "- **Nonstop** flights make up most of the route's capacity.\n\n"
+    "| Airline | Avg Price |\n|---|---|\n| Stub Air | 4500 |\n| Mock Jet | 5200 |\n| Test Airways | 6100 |\n"
+)
+
+
+class GeminiStubHandler(BaseHTTPRequestHandler):
+    # Keep-alive like the real endpoint, so pooled client sessions behave the same against the stub
+    protocol_version = "HTTP/1.1"
+    # Headers and body go out in separate writes; without this, Nagle + delayed ACK add ~40 ms per reply
+    disable_nagle_algorithm = True
+    delay = 0.0
+
+    def do_POST(self):
+        length = int(self.headers.get("Content-Length", 0))
+        body = json.loads(self.rfile.read(length) or b"{}")
+        prompt = body.get("contents", [{}])[0].get("parts", [{}])[0].get("text", "")
+        time.sleep(self.delay)
+        payload = json.dumps({
+            "candidates": [{"content": {"parts": [{"text": STUB_INSIGHT}]}}],
+            "usageMetadata": {"promptCharCount": len(prompt)},
+        }).encode("utf-8")
+        self.send_response(200)
+        self.send_header("Content-Type", "application/json")
+        self.send_header("Content-Length", str(len(payload)))
+        self.end_headers()
+        self.wfile.write(payload)
+
+    def log_message(self, fmt, *args):
+        print(f"[gemini-stub] {fmt % args}")
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Serve canned Gemini responses locally.")
+    parser.add_argument("--port", type=int, default=8090)
+    parser.add_argument("--delay", type=float, default=0.0, help="Seconds to wait before answering")
+    args = parser.parse_args()
+    GeminiStubHandler.delay = args.delay
+    print(f"Gemini stub listening on http://127.0.0.1:{args.port}/")
+    ThreadingHTTPServer(("127.0.0.1", args.port), GeminiStubHandler).serve_forever()
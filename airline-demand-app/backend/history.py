@@ -0,0 +1,92 @@
+import json
+import os
+import threading
+from datetime import datetime
+
+import pandas as pd
+
+from processor import load_flight_frame
+
+try:
+    import pyarrow  # noqa: F401
+    HAS_PARQUET = True
+except ImportError:
+    HAS_PARQUET = False
+
+# Columns kept per snapshot row; enough for every trend without the display text
+HISTORY_COLUMNS = ['Origin', 'Destination', 'Date', 'Scraped At', 'Airline Company', 'Stops', 'Price', 'DurationMin']
+CATEGORY_COLUMNS = ['Origin', 'Destination', 'Airline Company', 'Stops']
+
+_lock = threading.Lock()
+
+
+def _index_path(history_dir):
+    return os.path.join(history_dir, 'index.json')
+
+
+def _load_index(history_dir):
+    try:
+        with open(_index_path(history_dir), encoding='utf-8') as f:
+            return json.load(f)
+    except (OSError, ValueError):
+        return {}
+
+
+def append_snapshot(source_path, history_dir, default_route=None, frame=None):
+    """Append the rows of a finished scrape to the history, skipping (route, date, scrape time)
+    groups that are already recorded (days the scraper served from its cache). Returns rows added.
+    Pass the parsed rows as `frame` when they are still in memory to skip re-reading source_path."""
+    df = load_flight_frame(source_path) if frame is None else frame.copy()
+    if df.empty:
+        return 0
+    now = datetime.now().isoformat(timespec='seconds')
+    if 'Scraped At' not in df.columns:
+        df['Scraped At'] = now
+    for column, value in zip(('Origin', 'Destination'), default_route or (None, None)):
+        if column not in df.columns:
+            df[column] = value
+    for column in HISTORY_COLUMNS:
+        if column not in df.columns:
+            df[column] = None
+    df = df[HISTORY_COLUMNS]
+    with _lock:
+        os.makedirs(history_dir, exist_ok=True)
+        index = _load_index(history_dir)
+        keys = df['Origin'].astype(str) + '|' + df['Destination'].astype(str) + '|' + df['Date'].astype(str)
+        # Only keep groups scraped after the latest snapshot already recorded for that (route, date)
+        latest = keys.map(index).fillna('')
+        df = df[df['Scraped At'].astype(str) > latest]
+        if df.empty:
+            return 0
+        stamp = datetime.now().strftime('%Y%m%dT%H%M%S%f')
+        if HAS_PARQUET:
+            df.to_parquet(os.path.join(history_dir, f'snapshot-{stamp}.parquet'), index=False)
+        else:
+            df.to_csv(os.path.join(history_dir, f'snapshot-{stamp}.csv'), index=False)
+        kept_keys = keys.loc[df.index]
+        index.update(df.groupby(kept_keys)['Scraped At'].max().astype(str).to_dict())
+        tmp_path = _index_path(history_dir) + '.tmp'
+        with open(tmp_path, 'w', encoding='utf-8') as f:
+            json.dump(index, f)
+        os.replace(tmp_path, _index_path(history_dir))
+    return len(df)
+
+
+def load_history(history_dir):
+    """Every recorded snapshot row, with compact dtypes (categoricals, float32 prices, datetimes)."""
+    frames = []
+    for name in sorted(os.listdir(history_dir)) if os.path.isdir(history_dir) else []:
+        path = os.path.join(history_dir, name)
+        if name.endswith('.parquet'):
+            frames.append(pd.read_parquet(path, columns=HISTORY_COLUMNS))
+        elif name.endswith('.csv'):
+            frames.append(pd.read_csv(path, usecols=HISTORY_COLUMNS))
+    if not frames:
+        return pd.DataFrame(columns=HISTORY_COLUMNS)
+    df = pd.concat(frames, ignore_index=True)
+    for column in CATEGORY_COLUMNS:
+        df[column] = df[column].astype('category')
+    df['Date'] = pd.to_datetime(df['Date'], errors='coerce')
+    df['Scraped At'] = pd.to_datetime(df['Scraped At'], errors='coerce')
+    df['Price'] = df['Price'].astype('float32')
+    return df
@@ -0,0 +1,285 @@
+import asyncio
+import inspect
+import json
+import os
+import sys
+import time
+import uuid
+from collections import OrderedDict
+
+from metrics import count, observe
+
+ROWS_LINE_LIMIT = 32 * 2**20
+
+
+class ScrapeJob:
+    """One scrape request and its progress, as reported by the scraper per date.
+
+    Everything that happens to the job is also appended to `events` as (kind, data), which
+    stream() replays and then follows live until the job is closed.
+    """
+
+    def __init__(self, origin, destination, start_date, end_date):
+        self.id = uuid.uuid4().hex[:12]
+        self.origin = origin
+        self.destination = destination
+        self.start_date = start_date
+        self.end_date = end_date
+        self.status = "queued"
+        self.created_at = time.time()
+        self.started_at = None
+        self.finished_at = None
+        self.dates = OrderedDict()
+        self.error = None
+        self.output_path = None
+        self.events = []
+        # Per finished day, whatever the runner's on_rows keeps in memory (parsed rows, partials)
+        self.results = []
+        self.closed = False
+        self._new_event = asyncio.Event()
+
+    @property
+    def key(self):
+        return (self.origin, self.destination, self.start_date, self.end_date)
+
+    @property
+    def active(self):
+        return self.status in ("queued", "running")
+
+    def record_progress(self, event):
+        entry = self.dates.setdefault(event["date"], {})
+        entry.update({k: v for k, v in event.items() if k != "date"})
+        record_scrape_metrics(event)
+        self.publish("progress", event)
+
+    def publish(self, kind, data):
+        """Append an event and wake every stream() waiting on this job. Call from the event loop."""
+        self.events.append((kind, data))
+        self._new_event.set()
+        self._new_event = asyncio.Event()
+
+    def close(self):
+        """Publish the final state; streams end after delivering it. Replays of a closed job keep each
+        day's date and delta but not its rows: those are in the output CSV, and holding them would keep
+        every tracked job's whole scrape in memory."""
+        self.closed = True
+        self.events = [(kind, {**data, "rows": []}) if kind == "rows" else (kind, data) for kind, data in self.events]
+        self.publish("done", self.to_dict())
+
+    async def stream(self, start=0):
+        """Yield (index, kind, data) for events from `start` on, waiting for new ones until the job closes."""
+        index = start
+        while True:
+            while index < len(self.events):
+                yield (index, *self.events[index])
+                index += 1
+            if self.closed:
+                return
+            await self._new_event.wait()
+
+    def to_dict(self):
+        finished = [d for d in self.dates.values() if d.get("status") in ("done", "failed")]
+        return {
+            "job_id": self.id,
+            "status": self.status,
+            "origin": self.origin,
+            "destination": self.destination,
+            "start_date": self.start_date,
+            "end_date": self.end_date,
+            "created_at": self.created_at,
+            "started_at": self.started_at,
+            "finished_at": self.finished_at,
+            "elapsed_seconds": round((self.finished_at or time.time()) - (self.started_at or self.created_at), 3),
+            "dates_completed": len(finished),
+            "total_rows": sum(d.get("rows", 0) for d in self.dates.values()),
+            "dates": dict(self.dates),
+            "error": self.error,
+        }
+
+
+# Per-date timings the scraper reports (see scrape_page) -> stage names in /api/metrics
+SCRAPE_STAGES = {"goto_ms": "scrape_goto", "results_ms": "scrape_results_wait", "extract_ms": "scrape_extract"}
+
+
+def record_scrape_metrics(event):
+    """Turn one scraper progress event into metrics; the scraper itself stays free of backend imports."""
+    status = event.get("status")
+    if status == "running":
+        return
+    count("scrape_dates", status="cached" if event.get("cached") else status)
+    if event.get("cached"):
+        return
+    for field, stage in SCRAPE_STAGES.items():
+        if field in event:
+            observe(stage, event[field] / 1000)
+    if event.get("attempts", 1) > 1:
+        count("scrape_retries", event["attempts"] - 1)
+    for field in ("requests", "bytes", "blocked"):
+        if field in event:
+            count(f"scrape_{field}", event[field])
+
+
+class ScrapeJobManager:
+    """Runs scrape jobs in the background on a bounded number of workers.
+
+    Submitting a (origin, destination, start, end) that is already queued or running returns the
+    existing job instead of starting a second scrape. With output_path(job) -> file, jobs writing the same
+    file run one after another (scrape and on_success both), so they never interleave or read each other's.
+    """
+
+    def __init__(self, run_job, on_success=None, max_workers=2, max_history=100, output_path=None):
+        self.run_job = run_job
+        self.on_success = on_success
+        self.output_path = output_path
+        self._path_locks = {}
+        self.max_workers = max(1, max_workers)
+        self.max_history = max_history
+        self._jobs = OrderedDict()
+        self._active = {}
+        self._semaphore = None
+        # The loop only keeps weak references to tasks; hold them until they finish
+        self._tasks = set()
+
+    def submit(self, origin, destination, start_date, end_date):
+        """Queue a scrape and return (job, created). Must be called from the event loop."""
+        key = (origin, destination, start_date, end_date)
+        existing = self._jobs.get(self._active.get(key))
+        if existing and existing.active:
+            return existing, False
+        if self._semaphore is None:
+            self._semaphore = asyncio.Semaphore(self.max_workers)
+        job = ScrapeJob(origin, destination, start_date, end_date)
+        if self.output_path:
+            job.output_path = self.output_path(job)
+        self._jobs[job.id] = job
+        self._active[key] = job.id
+        self._prune()
+        task = asyncio.create_task(self._run(job))
+        self._tasks.add(task)
+        task.add_done_callback(self._tasks.discard)
+        return job, True
+
+    def get(self, job_id):
+        return self._jobs.get(job_id)
+
+    def stats(self):
+        statuses = [job.status for job in self._jobs.values()]
+        return {
+            "workers": self.max_workers,
+            "queued": statuses.count("queued"),
+            "running": statuses.count("running"),
+            "tracked": len(statuses),
+        }
+
+    async def _run(self, job):
+        if job.output_path is None:
+            return await self._execute(job)
+        # Taken before a worker slot, so a job waiting on its file doesn't hold one
+        lock = self._path_locks.setdefault(job.output_path, asyncio.Lock())
+        async with lock:
+            await self._execute(job)
+
+    async def _execute(self, job):
+        async with self._semaphore:
+            job.status = "running"
+            job.started_at = time.time()
+            observe("scrape_queue_wait", job.started_at - job.created_at)
+            job.publish("status", {"status": job.status})
+            try:
+                await self.run_job(job)
+                job.status = "succeeded"
+            except Exception as e:
+                job.status = "failed"
+                job.error = str(e) or type(e).__name__
+            finally:
+                job.finished_at = time.time()
+                observe("scrape_job", job.finished_at - job.started_at, status=job.status)
+                count("scrape_jobs", status=job.status)
+                if self._active.get(job.key) == job.id:
+                    del self._active[job.key]
+        try:
+            if job.status == "succeeded" and self.on_success:
+                try:
+                    await self.on_success(job)
+                except Exception as e:
+                    # The scrape ran, but its results never reached the app's data
+                    print(f"Scrape job {job.id}: publishing results failed: {e!r}")
+                    job.status = "failed"
+                    job.error = f"Publishing results failed: {str(e) or type(e).__name__}"
+                    count("scrape_publish_errors")
+        finally:
+            # on_success was their only reader
+            job.results.clear()
+            # Closed only after on_success, so streams see "done" once the results are ready to read
+            job.close()
+
+    def _prune(self):
+        while len(self._jobs) > self.max_history:
+            oldest = next((jid for jid, j in self._jobs.items() if not j.active), None)
+            if oldest is None:
+                return
+            del self._jobs[oldest]
+
+
+async def run_scraper_in_process(job, scrape_range, pool, output_filename, store_path=None, timeout=600,
+                                 on_rows=None, **options):
+    """Run the scraper's scrape_flights_date_range for the job on this event loop, against a browser pool
+    the app keeps warm. Progress goes straight into job.dates and rows to on_rows(job, date, rows)."""
+    try:
+        await asyncio.wait_for(scrape_range(
+            job.origin, job.destination, job.start_date, job.end_date, output_filename,
+            store_dir=store_path, on_progress=job.record_progress, pool=pool,
+            on_rows=(lambda date_str, rows: on_rows(job, date_str, rows)) if on_rows else None, **options), timeout)
+    except asyncio.TimeoutError:
+        raise RuntimeError(f"Scraper timed out after {timeout}s")
+
+
+async def run_scraper_subprocess(job, scraper_path, output_filename, store_path=None, timeout=600, extra_args=(),
+                                 on_rows=None):
+    """Run flight_scraper.py for the job, streaming its PROGRESS lines into job.dates.
+
+    With on_rows, the scraper also emits each finished date's rows and on_rows(job, date, rows) is called
+    as they arrive, in date order (and awaited, if it returns an awaitable).
+    """
+    cmd = [sys.executable, scraper_path, job.origin, job.destination, job.start_date, job.end_date,
+           '--filename', output_filename, '--progress-json']
+    if store_path:
+        cmd += ['--store', store_path]
+    if on_rows:
+        cmd += ['--emit-rows']
+    cmd += list(extra_args)
+    proc = await asyncio.create_subprocess_exec(
+        *cmd, cwd=os.path.dirname(scraper_path),
+        stdout=asyncio.subprocess.PIPE, stderr=asyncio.subprocess.PIPE,
+        # A ROWS line holds a whole day of flights, well past the default 64 KiB line limit
+        limit=ROWS_LINE_LIMIT,
+    )
+
+    async def read_progress():
+        async for line in proc.stdout:
+            text = line.decode('utf-8', errors='replace').strip()
+            if text.startswith("PROGRESS "):
+                job.record_progress(json.loads(text[len("PROGRESS "):]))
+            elif text.startswith("ROWS ") and on_rows:
+                event = json.loads(text[len("ROWS "):])
+                result = on_rows(job, event["date"], event["rows"])
+                if inspect.isawaitable(result):
+                    await result
+
+    progress = asyncio.ensure_future(read_progress())
+    errors = asyncio.ensure_future(proc.stderr.read())
+    try:
+        await asyncio.wait_for(asyncio.gather(progress, errors), timeout)
+        await proc.wait()
+    except asyncio.TimeoutError:
+        raise RuntimeError(f"Scraper timed out after {timeout}s")
+    finally:
+        # However the wait ended (timeout, a failing on_rows, cancellation), leave no reader or scraper behind
+        for task in (progress, errors):
+            task.cancel()
+        if proc.returncode is None:
+            proc.kill()
+            await proc.wait()
+    stderr = errors.result()
+    if proc.returncode != 0:
+        raise RuntimeError(stderr.decode('utf-8', errors='replace').strip()[-2000:] or f"exit code {proc.returncode}")
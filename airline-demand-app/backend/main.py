@@ -1,17 +1,67 @@
-from fastapi import FastAPI, Query, Request
+from fastapi import BackgroundTasks, FastAPI, Query, Request
 from fastapi.middleware.cors import CORSMiddleware
-from fastapi.responses import JSONResponse
-from pydantic import BaseModel
-import subprocess
+from fastapi.responses import JSONResponse, PlainTextResponse, StreamingResponse
+from pydantic import BaseModel, field_validator, model_validator
+from concurrent.futures import ProcessPoolExecutor
+from concurrent.futures.process import BrokenProcessPool
+from contextlib import asynccontextmanager
+import asyncio
+import functools
+import multiprocessing
 import os
 import sys
-from processor import process_flight_csv
-from ai_insights import get_ai_insights_from_csv
+from datetime import date, datetime
+import pandas as pd
+from processor import (build_flight_table, compute_price_trends, flight_frame, flight_partial,
+                       merge_partials, partial_delta, process_flight_csv)
+from history import append_snapshot, load_history
+from summary import (DEFAULT_BINS, DEFAULT_SCATTER_POINTS, materialize_from_partial, materialize_summary, read_summary,
+                     summary_analytics)
+from ai_insights import cached_insight_key, get_ai_insights_from_csv, get_cached_ai_insights, refresh_ai_insights
+from cache import AnalyticsCache, file_fingerprint
+from airports import AirportIndex, validate_code
+from jobs import ScrapeJobManager, run_scraper_in_process, run_scraper_subprocess
+from responses import FastJSONResponse, add_compression, dumps, etag, is_fresh, not_modified, validators
+import metrics
+import query_engine
 from dotenv import load_dotenv
-import math
 load_dotenv()
 
-app = FastAPI()
+SCRAPER_DIR = os.path.abspath(os.path.join(os.path.dirname(__file__), '../../scraper'))
+sys.path.insert(0, SCRAPER_DIR)
+try:
+    import flight_scraper
+except ImportError as e:  # playwright missing: scrapes can still run in a subprocess with its own environment
+    print(f"Scraper not importable in-process ({e}); using the subprocess runner")
+    flight_scraper = None
+
+# SCRAPER_MODE=inprocess (default) scrapes on this event loop against a browser kept warm between jobs;
+# subprocess launches flight_scraper.py (and a fresh Chromium) per job
+SCRAPER_MODE = os.getenv("SCRAPER_MODE", "inprocess")
+SCRAPER_CONCURRENCY = int(os.getenv("SCRAPER_CONCURRENCY", "4"))
+# SCRAPER_LEAN=1 blocks images/fonts/analytics during scrapes
+SCRAPER_LEAN = os.getenv("SCRAPER_LEAN", "0") == "1"
+browser_pool = None
+
+async def start_browser_pool():
+    global browser_pool
+    try:
+        browser_pool = await flight_scraper.BrowserPool(SCRAPER_CONCURRENCY, lean=SCRAPER_LEAN).start()
+    except Exception as e:
+        print(f"Could not start the browser pool ({e}); using the subprocess runner")
+        browser_pool = None
+
+@asynccontextmanager
+async def lifespan(app):
+    if SCRAPER_MODE == "inprocess" and flight_scraper is not None:
+        await start_browser_pool()
+    yield
+    if browser_pool is not None:
+        await browser_pool.close()
+    if analytics_pool is not None:
+        analytics_pool.shutdown(wait=False, cancel_futures=True)
+
+app = FastAPI(lifespan=lifespan)
 
 # Allow frontend to talk to backend
 app.add_middleware(
@@ -20,37 +70,193 @@ app.add_middleware(
     allow_methods=["*"],
     allow_headers=["*"],
 )
+# Large analytics/flights payloads compress well; RESPONSE_COMPRESSION=off|gzip|br
+add_compression(app)
+# Per-stage timers, /api/metrics, Server-Timing headers and ?profile=1 (PROFILE_REQUESTS=1)
+metrics.add_instrumentation(app)
 
 # Store the latest CSV filename in memory (per server run)
 LATEST_CSV_PATH = os.path.join(os.path.dirname(__file__), '../../scraper/csv_output/flight_data.csv')
 
+# Parquet store the scraper keeps alongside the CSV; FLIGHT_DATA_SOURCE=store analyzes it instead
+STORE_PATH = os.path.join(os.path.dirname(__file__), '../../scraper/csv_output/store')
+# Per-route CSVs written by the scraper's --manifest batch mode; FLIGHT_DATA_SOURCE=routes analyzes them together
+ROUTES_PATH = os.path.join(os.path.dirname(__file__), '../../scraper/csv_output/routes')
+DATA_SOURCE = os.getenv("FLIGHT_DATA_SOURCE", "csv")
+# Every finished scrape is appended here (stamped with scrape time) for /api/trends
+HISTORY_PATH = os.path.join(os.path.dirname(__file__), '../../scraper/csv_output/history')
+
 def get_csv_path():
+    if DATA_SOURCE == "store":
+        return STORE_PATH
+    if DATA_SOURCE == "routes":
+        return ROUTES_PATH
     return LATEST_CSV_PATH
 
+# Processed analytics per CSV version; a new scrape changes the file's mtime/size and misses the cache
+analytics_cache = AnalyticsCache(max_entries=int(os.getenv("ANALYTICS_CACHE_SIZE", "4")))
+
 # Path to the latest CSV generated by the scraper
 CSV_PATH = os.path.join(os.path.dirname(__file__), '../../scraper/csv_output/flight_data.csv')
 
-def safe_for_json(obj):
-    if isinstance(obj, float):
-        if math.isinf(obj) or math.isnan(obj):
-            return None
-        return obj
-    if isinstance(obj, dict):
-        return {k: safe_for_json(v) for k, v in obj.items()}
-    if isinstance(obj, list):
-        return [safe_for_json(v) for v in obj]
-    return obj
+# Full-table parses and re-binned analytics run in this many worker processes, so a burst of dashboard
+# clients queues CPU work here instead of holding the GIL against the event loop and request threads.
+# Spawned, not forked: the server has threads and a browser pool running. ANALYTICS_WORKERS=0 uses a thread.
+ANALYTICS_WORKERS = int(os.getenv("ANALYTICS_WORKERS", "2"))
+
+def new_analytics_pool():
+    if ANALYTICS_WORKERS <= 0:
+        return None
+    return ProcessPoolExecutor(ANALYTICS_WORKERS, mp_context=multiprocessing.get_context("spawn"))
+
+analytics_pool = new_analytics_pool()
+
+async def run_analytics(fn, *args):
+    """fn(*args) in the analytics pool. Stages timed inside a worker don't reach /api/metrics, so the
+    whole call (queueing included) is timed here."""
+    global analytics_pool
+    with metrics.timer("analytics_pool"):
+        if analytics_pool is None:
+            return await asyncio.to_thread(fn, *args)
+        pool = analytics_pool
+        try:
+            return await asyncio.get_running_loop().run_in_executor(pool, functools.partial(fn, *args))
+        except BrokenProcessPool:
+            # A worker died (killed for memory, say); a broken pool refuses all later work, so replace it
+            if analytics_pool is pool:
+                print("Analytics worker died; restarting the process pool")
+                analytics_pool = new_analytics_pool()
+            raise
+
+async def default_analytics(path):
+    """The summary's analytics. A summary left stale by a change outside a scrape is rebuilt in the
+    analytics pool, not on a request thread."""
+    summary = await asyncio.to_thread(read_summary, path)
+    if summary is None:
+        return await run_analytics(summary_analytics, path)
+    return summary['analytics']
 
 @app.get("/api/analyze")
-def analyze_flights():
+async def analyze_flights(
+    request: Request,
+    background_tasks: BackgroundTasks,
+    include_all_flights: bool = False,
+    bins: str = Query("fd", pattern=r"^(fd|[1-9]\d{0,2})$"),
+    scatter_points: int = Query(500, ge=10, le=5000),
+):
+    csv_path = get_csv_path()
+    if not os.path.exists(csv_path):
+        return {"error": "No flight data available. Please run the scraper first."}
+    fingerprint = await asyncio.to_thread(file_fingerprint, csv_path)
+    # Also brings the summary up to date, so looking up the AI insight (whose prompt is built from the
+    # summary) never rebuilds it here
+    summary = await analytics_cache.get_or_compute_async(csv_path, default_analytics, "summary")
+    ai_insights = await asyncio.to_thread(get_cached_ai_insights, csv_path)
+    tag = etag(fingerprint, include_all_flights, bins, scatter_points, ai_insights is not None)
+    # The body still changes once the insight arrives, so only a complete one gets a Last-Modified
+    modified_ns = fingerprint[1] if ai_insights is not None else None
+    headers = validators(tag, modified_ns)
+    if is_fresh(request.headers, tag, modified_ns):
+        return not_modified(headers)
+    if include_all_flights:
+        analytics = await analytics_cache.get_or_compute_async(
+            csv_path, lambda path: run_analytics(process_flight_csv, path, include_all_flights, bins, scatter_points),
+            include_all_flights, bins, scatter_points)
+    elif bins == DEFAULT_BINS and scatter_points == DEFAULT_SCATTER_POINTS:
+        # Materialized when the scrape finished, so usually just a read of the summary file
+        analytics = summary
+    else:
+        analytics = await analytics_cache.get_or_compute_async(
+            csv_path, lambda path: run_analytics(summary_analytics, path, bins, scatter_points),
+            "summary", bins, scatter_points)
+    # Copy so adding the AI text below doesn't mutate the cached result
+    insights = dict(analytics)
+    # Attach the AI insight only if it's already cached; otherwise generate it after responding
+    insights["ai_insights"] = ai_insights
+    insights["ai_insights_status"] = "ready" if ai_insights is not None else "pending"
+    if ai_insights is None:
+        background_tasks.add_task(refresh_ai_insights, csv_path)
+    return FastJSONResponse(insights, headers=headers)
+
+@app.get("/api/flights")
+async def list_flights(
+    sort: str = Query("price", pattern="^(price|duration|departure)$"),
+    order: str = Query("asc", pattern="^(asc|desc)$"),
+    offset: int = Query(0, ge=0),
+    limit: int = Query(50, ge=1, le=500),
+    airline: str = None,
+    stops: str = None,
+    date: str = None,
+    min_price: float = None,
+    max_price: float = None,
+    route: str = Query(None, description="ORIGIN-DEST, e.g. DEL-BOM"),
+):
+    """Page through the flights table with server-side filtering and sorting."""
+    csv_path = get_csv_path()
+    if not os.path.exists(csv_path):
+        return {"error": "No flight data available. Please run the scraper first."}
+    # The table is parsed from the whole CSV, so it is built in the analytics pool
+    table = await analytics_cache.get_or_compute_async(
+        csv_path, lambda path: run_analytics(build_flight_table, path), "flights")
+    return FastJSONResponse(await asyncio.to_thread(
+        table.query, sort=sort, descending=order == "desc", offset=offset, limit=limit,
+        airline=airline, stops=stops, date=date, min_price=min_price, max_price=max_price, route=route,
+    ))
+
+@app.get("/api/trends")
+def price_trends(
+    route: str = Query(None, description="ORIGIN-DEST, e.g. DEL-BOM"),
+    start_date: date = Query(None, description="YYYY-MM-DD"),
+    end_date: date = Query(None, description="YYYY-MM-DD"),
+):
+    """Price trends across every recorded scrape: per departure date, per snapshot and by days to departure."""
+    if not os.path.isdir(HISTORY_PATH):
+        return {"error": "No scrape history yet. Run a scrape first."}
+    return FastJSONResponse(analytics_cache.get_or_compute(
+        HISTORY_PATH,
+        lambda path: compute_price_trends(
+            analytics_cache.get_or_compute(path, load_history, "history"), route, start_date, end_date),
+        "trends", route, start_date, end_date))
+
+@app.get("/api/query")
+def run_query(
+    group_by: str = Query("", description=f"Comma-separated: {', '.join(query_engine.DIMENSIONS)}"),
+    metric_list: str = Query("count", alias="metrics",
+                             description=f"Comma-separated: {', '.join(query_engine.METRICS)}"),
+    order_by: str = None,
+    order: str = Query("asc", pattern="^(asc|desc)$"),
+    limit: int = Query(100, ge=1, le=1000),
+    offset: int = Query(0, ge=0),
+    airline: list[str] = Query(None),
+    stops: list[str] = Query(None),
+    origin: list[str] = Query(None),
+    destination: list[str] = Query(None),
+    route: list[str] = Query(None, description="ORIGIN-DEST, e.g. DEL-BOM"),
+    date_from: str = None,
+    date_to: str = None,
+    min_price: float = None,
+    max_price: float = None,
+):
+    """Ad-hoc aggregates over the flights database, e.g. ?group_by=airline,stops&metrics=count,p50_price.
+    Repeat a filter to match any of its values (?airline=IndiGo&airline=Vistara)."""
     csv_path = get_csv_path()
     if not os.path.exists(csv_path):
         return {"error": "No flight data available. Please run the scraper first."}
-    insights = process_flight_csv(csv_path)
-    # Add AI insights
-    insights["ai_insights"] = get_ai_insights_from_csv(csv_path)
-    # Clean all floats for JSON serialization
-    return safe_for_json(insights)
+    filters = {name: value for name, value in {
+        "airline": airline, "stops": stops, "origin": origin, "destination": destination, "route": route,
+        "date_from": date_from, "date_to": date_to, "min_price": min_price, "max_price": max_price,
+    }.items() if value not in (None, [])}
+    try:
+        result = query_engine.query(
+            csv_path, [d for d in group_by.split(",") if d], [m for m in metric_list.split(",") if m], filters,
+            order_by, order == "desc", limit, offset)
+    except ValueError as e:
+        return JSONResponse(status_code=400, content={"error": str(e)})
+    return FastJSONResponse(result)
+
+# Loaded once; /api/airports searches it and scrape requests are checked against it
+airport_index = AirportIndex.load()
+print(f"Loaded {len(airport_index)} airports")
 
 class ScrapeRequest(BaseModel):
     origin: str
@@ -59,23 +265,131 @@ class ScrapeRequest(BaseModel):
     end_date: str
     filename: str
 
-@app.post("/api/scrape")
-def scrape_flights(req: ScrapeRequest):
+    # Rejected here with a 422, before a job is queued or a browser page is opened
+    @field_validator('origin', 'destination')
+    @classmethod
+    def known_airport(cls, code):
+        return validate_code(code, airport_index)
+
+    @field_validator('start_date', 'end_date')
+    @classmethod
+    def iso_date(cls, value):
+        try:
+            # Same format the scraper parses; normalized so equal ranges dedupe to one job
+            return datetime.strptime(value, "%Y-%m-%d").strftime("%Y-%m-%d")
+        except ValueError:
+            raise ValueError(f"'{value}' is not a YYYY-MM-DD date")
+
+    @model_validator(mode='after')
+    def distinct_route(self):
+        if self.origin == self.destination:
+            raise ValueError("origin and destination must be different airports")
+        if self.start_date > self.end_date:
+            raise ValueError("start_date is after end_date")
+        return self
+
+SCRAPER_PATH = os.path.join(SCRAPER_DIR, 'flight_scraper.py')
+SCRAPE_TIMEOUT = int(os.getenv("SCRAPE_TIMEOUT", "600"))
+# Days scraped more recently than this are reused from the scraper's cache (0 always re-scrapes)
+SCRAPE_CACHE_TTL_HOURS = os.getenv("SCRAPE_CACHE_TTL_HOURS", "6")
+
+def parse_day(rows):
+    frame = flight_frame(rows)
+    partial = flight_partial(frame)
+    return frame, partial, partial_delta(partial)
+
+async def publish_rows(job, date_str, rows):
+    """Push a finished day to the job's event stream with the aggregate delta it adds to the dashboard.
+    The parsed rows and their partial are kept on the job so on_scrape_success needn't re-read the CSV.
+    Parsing runs on a thread so the event loop keeps serving other requests and streams meanwhile."""
+    delta = None
+    if rows:
+        frame, partial, delta = await asyncio.to_thread(parse_day, rows)
+        job.results.append((date_str, frame, partial))
+    job.publish("rows", {"date": date_str, "rows": rows, "delta": delta})
+
+# Always use 'flight_data.csv' as the output filename
+SCRAPE_OUTPUT_FILENAME = 'flight_data.csv'
+
+def scrape_output_path(job):
+    return os.path.join(SCRAPER_DIR, 'csv_output', SCRAPE_OUTPUT_FILENAME)
+
+async def run_scrape_job(job):
+    forced_filename = SCRAPE_OUTPUT_FILENAME
+    if browser_pool is not None:
+        if not browser_pool.healthy:
+            print("Browser pool is down; restarting it")
+            await browser_pool.close()
+            await start_browser_pool()
+    if browser_pool is not None:
+        await run_scraper_in_process(job, flight_scraper.scrape_flights_date_range, browser_pool, forced_filename,
+                                     os.path.abspath(STORE_PATH), SCRAPE_TIMEOUT, on_rows=publish_rows,
+                                     cache_ttl_hours=float(SCRAPE_CACHE_TTL_HOURS))
+    else:
+        await run_scraper_subprocess(job, SCRAPER_PATH, forced_filename, os.path.abspath(STORE_PATH), SCRAPE_TIMEOUT,
+                                     extra_args=['--cache-ttl', SCRAPE_CACHE_TTL_HOURS] + (['--lean'] if SCRAPER_LEAN else []),
+                                     on_rows=publish_rows)
+
+async def on_scrape_success(job):
     global LATEST_CSV_PATH
-    # Always use 'flight_data.csv' as the output filename
-    forced_filename = 'flight_data.csv'
-    scraper_path = os.path.abspath(os.path.join(os.path.dirname(__file__), '../../scraper/flight_scraper.py'))
-    output_path = os.path.abspath(os.path.join(os.path.dirname(__file__), f"../../scraper/csv_output/{forced_filename}"))
-    cmd = [sys.executable, scraper_path, req.origin, req.destination, req.start_date, req.end_date, '--filename', forced_filename]
-    try:
-        result = subprocess.run(cmd, capture_output=True, text=True, cwd=os.path.dirname(scraper_path), timeout=600)
-        if result.returncode != 0:
-            return JSONResponse(status_code=500, content={"status": "Scraping failed", "details": result.stderr})
-        # Update the latest CSV path for analysis
-        LATEST_CSV_PATH = output_path
-        return {"status": "Scraping complete!", "details": result.stdout}
-    except Exception as e:
-        return JSONResponse(status_code=500, content={"status": "Scraping error", "details": str(e)})
+    # Update the latest CSV path for analysis
+    LATEST_CSV_PATH = job.output_path
+    analytics_cache.invalidate(job.output_path)
+    # The CSV holds exactly the days publish_rows saw, already parsed: history and summary reuse them
+    frame = pd.concat([f for _, f, _ in job.results], ignore_index=True) if job.results else None
+    with metrics.timer("history_append"):
+        await asyncio.to_thread(append_snapshot, job.output_path, HISTORY_PATH, (job.origin, job.destination), frame)
+    if DATA_SOURCE == "csv" and job.results:
+        partial = merge_partials(p for _, _, p in job.results)
+        await asyncio.to_thread(materialize_from_partial, job.output_path, partial)
+    else:
+        # Only the days this scrape rewrote are re-aggregated; the rest of the summary is reused
+        await asyncio.to_thread(materialize_summary, get_csv_path())
+    # Loaded now rather than by the first /api/query after the scrape
+    await asyncio.to_thread(query_engine.ingest, get_csv_path())
+    await asyncio.to_thread(refresh_ai_insights, get_csv_path())
+
+# Jobs share the output file, so they take turns on it; SCRAPE_WORKERS still bounds jobs writing elsewhere
+scrape_jobs = ScrapeJobManager(run_scrape_job, on_scrape_success, max_workers=int(os.getenv("SCRAPE_WORKERS", "2")),
+                               output_path=scrape_output_path)
+
+@app.post("/api/scrape", status_code=202)
+async def scrape_flights(req: ScrapeRequest):
+    """Queue a scrape and return its job id; identical in-flight requests share one job."""
+    job, created = scrape_jobs.submit(req.origin, req.destination, req.start_date, req.end_date)
+    return {**job.to_dict(), "deduplicated": not created}
+
+@app.get("/api/airports")
+def search_airports(q: str = Query(..., min_length=1, max_length=64), limit: int = Query(10, ge=1, le=50)):
+    """Autocomplete: airports whose code, city or name starts with q, best matches first."""
+    with metrics.timer("airport_search"):
+        airports = airport_index.search(q, limit)
+    return FastJSONResponse({"airports": airports})
+
+@app.get("/api/scrape/{job_id}")
+def scrape_status(job_id: str):
+    job = scrape_jobs.get(job_id)
+    if job is None:
+        return JSONResponse(status_code=404, content={"error": f"Unknown scrape job {job_id}"})
+    return job.to_dict()
+
+@app.get("/api/scrape/{job_id}/events")
+async def scrape_events(job_id: str, request: Request):
+    """Server-Sent Events for a scrape: progress, each finished day's rows with its aggregate delta,
+    then a final "done" with the job state. Reconnecting clients resume after Last-Event-ID."""
+    job = scrape_jobs.get(job_id)
+    if job is None:
+        return JSONResponse(status_code=404, content={"error": f"Unknown scrape job {job_id}"})
+    last_id = request.headers.get("last-event-id", "")
+    start = int(last_id) + 1 if last_id.isdigit() else 0
+
+    async def events():
+        async for index, kind, data in job.stream(start):
+            if await request.is_disconnected():
+                return
+            yield f"id: {index}\nevent: {kind}\ndata: {dumps(data).decode('utf-8')}\n\n"
+
+    return StreamingResponse(events(), media_type="text/event-stream", headers={"Cache-Control": "no-cache"})
 
 @app.get("/api/dashboard")
 def dashboard_info():
@@ -85,15 +399,33 @@ def dashboard_info():
         "status": "online",
         "data_available": os.path.exists(csv_path),
         "csv_path": csv_path,
-        "endpoints": ["/api/analyze", "/api/scrape", "/api/ai-insight", "/api/dashboard"]
+        "analytics_cache": analytics_cache.stats(),
+        "scrape_jobs": scrape_jobs.stats(),
+        "endpoints": ["/api/analyze", "/api/flights", "/api/trends", "/api/scrape", "/api/scrape/{job_id}", "/api/scrape/{job_id}/events", "/api/ai-insight", "/api/dashboard", "/api/metrics", "/api/airports", "/api/query"]
     }
 
+@app.get("/api/metrics")
+def metrics_endpoint():
+    """Prometheus text format: per-stage timing histograms, counters, and cache/job gauges."""
+    gauges = {f"analytics_cache_{k}": v for k, v in analytics_cache.stats().items()}
+    gauges.update({f"scrape_jobs_{k}": v for k, v in scrape_jobs.stats().items()})
+    return PlainTextResponse(metrics.render(gauges), media_type="text/plain; version=0.0.4")
+
 @app.get("/api/ai-insight")
-def ai_insight():
+def ai_insight(request: Request):
     load_dotenv()  # Force reload .env every call (for debug)
-    print("DEBUG: GEMINI_API_KEY =", os.getenv("GEMINI_API_KEY"))
     csv_path = get_csv_path()
     if not os.path.exists(csv_path):
         return {"error": "No flight data available. Please run the scraper first."}
+    # A stored insight is versioned by its prompt, which changes whenever the data summary does
+    key = cached_insight_key(csv_path)
+    if key is not None:
+        modified_ns = file_fingerprint(csv_path)[1]
+        if is_fresh(request.headers, etag(key), modified_ns):
+            return not_modified(validators(etag(key), modified_ns))
+    # Concurrent requests for an insight that isn't stored yet share one Gemini call
     ai_result = get_ai_insights_from_csv(csv_path)
-    return {"ai_insights": ai_result}
+    key = cached_insight_key(csv_path)
+    # Errors aren't stored, so they get no validators and are retried on the next request
+    headers = validators(etag(key), file_fingerprint(csv_path)[1]) if key is not None else None
+    return JSONResponse({"ai_insights": ai_result}, headers=headers)
@@ -0,0 +1,213 @@
+import asyncio
+import cProfile
+import contextvars
+import functools
+import math
+import os
+import re
+import threading
+import time
+from contextlib import contextmanager
+from datetime import datetime
+
+from fastapi.routing import APIRoute
+
+# SERVER_TIMING=1 adds a Server-Timing header with the stages each API response went through
+SERVER_TIMING = os.getenv("SERVER_TIMING", "1") == "1"
+# PROFILE_REQUESTS=1 lets ?profile=1 run that request's endpoint under cProfile (stats go to PROFILE_DIR)
+PROFILE_REQUESTS = os.getenv("PROFILE_REQUESTS", "0") == "1"
+PROFILE_DIR = os.getenv("PROFILE_DIR", os.path.join(os.path.dirname(__file__), '.profiles'))
+
+PREFIX = "airline_"
+BUCKETS = (0.001, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10, 30, 60, math.inf)
+
+_lock = threading.Lock()
+_histograms = {}  # (stage, labels) -> [bucket counts..., sum]
+_counters = {}  # name -> {labels: value}
+# Per-request list of (stage, seconds), shared with the threads the request's work runs on
+_request_timings = contextvars.ContextVar("request_timings", default=None)
+_request_profile = contextvars.ContextVar("request_profile", default=None)
+
+
+def _labels(labels):
+    return tuple(sorted((k, str(v)) for k, v in labels.items()))
+
+
+def observe(stage, seconds, **labels):
+    """Record one duration for stage; it also shows up in the current request's Server-Timing."""
+    key = (stage, _labels(labels))
+    with _lock:
+        counts = _histograms.get(key)
+        if counts is None:
+            counts = _histograms[key] = [0] * (len(BUCKETS) + 1)
+        for i, bound in enumerate(BUCKETS):
+            if seconds <= bound:
+                counts[i] += 1
+        counts[-1] += seconds
+    timings = _request_timings.get()
+    if timings is not None:
+        timings.append((stage, seconds))
+
+
+def count(name, value=1, **labels):
+    with _lock:
+        series = _counters.setdefault(name, {})
+        key = _labels(labels)
+        series[key] = series.get(key, 0) + value
+
+
+@contextmanager
+def timer(stage, **labels):
+    t0 = time.perf_counter()
+    try:
+        yield
+    finally:
+        observe(stage, time.perf_counter() - t0, **labels)
+
+
+def timed(stage):
+    """Decorator form of timer()."""
+    def decorator(fn):
+        @functools.wraps(fn)
+        def wrapper(*args, **kwargs):
+            with timer(stage):
+                return fn(*args, **kwargs)
+        return wrapper
+    return decorator
+
+
+def _escape(value):
+    return str(value).replace('\\', '\\\\').replace('"', '\\"').replace('\n', '\\n')
+
+
+def _format_labels(labels, extra=()):
+    pairs = list(labels) + list(extra)
+    if not pairs:
+        return ""
+    return "{" + ",".join(f'{k}="{_escape(v)}"' for k, v in pairs) + "}"
+
+
+def render(gauges=None):
+    """All metrics in the Prometheus text exposition format, plus point-in-time `gauges` ({name: value})."""
+    with _lock:
+        histograms = {k: list(v) for k, v in _histograms.items()}
+        counters = {name: dict(series) for name, series in _counters.items()}
+    name = PREFIX + "stage_seconds"
+    lines = [f"# HELP {name} Time spent per processing stage.", f"# TYPE {name} histogram"]
+    for (stage, labels), counts in sorted(histograms.items()):
+        labels = (("stage", stage),) + labels
+        for bound, n in zip(BUCKETS, counts):
+            le = "+Inf" if bound == math.inf else repr(float(bound))
+            lines.append(f"{name}_bucket{_format_labels(labels, [('le', le)])} {n}")
+        lines.append(f"{name}_sum{_format_labels(labels)} {counts[-1]}")
+        lines.append(f"{name}_count{_format_labels(labels)} {counts[len(BUCKETS) - 1]}")
+    for counter, series in sorted(counters.items()):
+        name = f"{PREFIX}{counter}_total"
+        lines.append(f"# TYPE {name} counter")
+        lines += [f"{name}{_format_labels(labels)} {value}" for labels, value in sorted(series.items())]
+    for gauge, value in sorted((gauges or {}).items()):
+        lines += [f"# TYPE {PREFIX}{gauge} gauge", f"{PREFIX}{gauge} {value}"]
+    return "\n".join(lines) + "\n"
+
+
+def server_timing(timings):
+    """Server-Timing header value: total milliseconds per stage, in order of first appearance."""
+    totals = {}
+    for stage, seconds in timings:
+        totals[stage] = totals.get(stage, 0) + seconds
+    return ", ".join(f"{re.sub(r'[^A-Za-z0-9_.-]', '_', stage)};dur={seconds * 1000:.1f}"
+                     for stage, seconds in totals.items())
+
+
+def _profiled(endpoint):
+    """Run endpoint under the request's profiler when one was asked for. Sync endpoints execute in a
+    worker thread, and cProfile only sees the thread that enabled it, so it has to start in here."""
+    if asyncio.iscoroutinefunction(endpoint):
+        @functools.wraps(endpoint)
+        async def wrapper(*args, **kwargs):
+            profiler = _request_profile.get()
+            if profiler is None:
+                return await endpoint(*args, **kwargs)
+            # Other requests' coroutines interleave on the loop and are counted too
+            profiler.enable()
+            try:
+                return await endpoint(*args, **kwargs)
+            finally:
+                profiler.disable()
+    else:
+        @functools.wraps(endpoint)
+        def wrapper(*args, **kwargs):
+            profiler = _request_profile.get()
+            if profiler is None:
+                return endpoint(*args, **kwargs)
+            profiler.enable()
+            try:
+                return endpoint(*args, **kwargs)
+            finally:
+                profiler.disable()
+    return wrapper
+
+
+class InstrumentedRoute(APIRoute):
+    """Route class that makes every endpoint profileable per request (see PROFILE_REQUESTS)."""
+
+    def __init__(self, path, endpoint, **kwargs):
+        super().__init__(path, _profiled(endpoint), **kwargs)
+
+
+def _save_profile(profiler, path):
+    os.makedirs(PROFILE_DIR, exist_ok=True)
+    name = f"{datetime.now():%Y%m%dT%H%M%S%f}-{re.sub(r'[^A-Za-z0-9]+', '_', path).strip('_')}.prof"
+    profiler.dump_stats(os.path.join(PROFILE_DIR, name))
+    print(f"Saved profile of {path} to {os.path.join(PROFILE_DIR, name)} (open with pstats or snakeviz)")
+    return name
+
+
+class MetricsMiddleware:
+    """Times every HTTP request, collects the stages it ran for Server-Timing and, when requested,
+    profiles it. Plain ASGI so streaming responses (SSE) pass straight through."""
+
+    def __init__(self, app):
+        self.app = app
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http":
+            return await self.app(scope, receive, send)
+        timings = []
+        timings_token = _request_timings.set(timings)
+        profiler = None
+        if PROFILE_REQUESTS and b"profile=1" in scope.get("query_string", b""):
+            profiler = cProfile.Profile()
+        profile_token = _request_profile.set(profiler)
+        status = 500
+        t0 = time.perf_counter()
+
+        async def send_with_timing(message):
+            nonlocal status
+            if message["type"] == "http.response.start":
+                status = message["status"]
+                headers = list(message.get("headers", []))
+                if SERVER_TIMING and timings:
+                    headers.append((b"server-timing", server_timing(timings).encode("latin-1")))
+                    # Lets the dashboard (another origin) read the header through the Resource Timing API
+                    headers.append((b"timing-allow-origin", b"*"))
+                if profiler is not None:
+                    headers.append((b"x-profile", _save_profile(profiler, scope["path"]).encode("latin-1")))
+                message = {**message, "headers": headers}
+            await send(message)
+
+        try:
+            await self.app(scope, receive, send_with_timing)
+        finally:
+            _request_timings.reset(timings_token)
+            _request_profile.reset(profile_token)
+            # Route template, not the raw path, so job ids don't each become a series
+            route = getattr(scope.get("route"), "path", "unmatched")
+            observe("http_request", time.perf_counter() - t0, route=route, method=scope["method"])
+            count("http_requests", route=route, method=scope["method"], status=status)
+
+
+def add_instrumentation(app):
+    """Time requests and make endpoints profileable. Call before any route is declared."""
+    app.router.route_class = InstrumentedRoute
+    app.add_middleware(MetricsMiddleware)
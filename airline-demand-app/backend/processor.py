@@ -1,5 +1,8 @@
+import os
+import numpy as np
 import pandas as pd
 import re
+from metrics import count, timed, timer
 
 def parse_price(price_str):
     """Remove currency symbols and commas, convert to float. Handle empty/invalid data."""
@@ -38,6 +41,264 @@ def parse_duration(duration_str):
     except (ValueError, AttributeError):
         return None
 
+def _on_unique(series, parse):
+    """Run a vectorized parser on the distinct values only and broadcast back; scraped columns repeat heavily."""
+    codes, uniques = pd.factorize(series, use_na_sentinel=True)
+    parsed = parse(pd.Series(uniques, dtype=object)).to_numpy(dtype=float)
+    # Missing cells get code -1, which lands on the trailing NaN
+    return pd.Series(np.append(parsed, np.nan)[codes], index=series.index, dtype=float)
+
+def _parse_numbers(values):
+    cleaned = values.astype(str).str.replace(r'[^\d.]', '', regex=True)
+    return pd.to_numeric(cleaned, errors='coerce')
+
+def _parse_durations(values):
+    try:
+        # Non-string cells (numbers) come back as NaN from the .str accessor
+        text = values.astype(object).str
+    except AttributeError:
+        return pd.Series(np.nan, index=values.index, dtype=float)
+    hr = text.extract(r'^(\d+) hr(?: (\d+) min)?').astype(float)
+    minutes = hr[0] * 60 + hr[1].fillna(0)
+    only_min = text.extract(r'^(\d+) min', expand=False).astype(float)
+    return minutes.fillna(only_min)
+
+def parse_price_series(prices):
+    """Vectorized equivalent of parse_price over a whole column."""
+    return _on_unique(prices, _parse_numbers)
+
+def parse_co2_series(co2_values):
+    """Vectorized equivalent of parse_co2 over a whole column."""
+    return _on_unique(co2_values, _parse_numbers)
+
+def parse_duration_series(durations):
+    """Vectorized equivalent of parse_duration: '1 hr 25 min' -> 85.0, NaN for anything unparseable."""
+    return _on_unique(durations, _parse_durations)
+
+def _parse_clock_times(values):
+    parts = values.astype(str).str.extract(r'(\d{1,2}):(\d{2})\s*([AP]M)', flags=re.IGNORECASE)
+    hours = parts[0].astype(float) % 12 + np.where(parts[2].str.upper() == 'PM', 12, 0)
+    return hours * 60 + parts[1].astype(float)
+
+def parse_clock_series(times):
+    """Vectorized '6:05 PM' -> minutes after midnight (1085.0), NaN when no time is found."""
+    return _on_unique(times, _parse_clock_times)
+
+def load_flight_store(store_dir, columns=None, routes=None, dates=None):
+    """Read the scraper's Parquet store (route=/date= partitions). Numeric columns come pre-parsed,
+    and only `columns` are loaded; `routes`/`dates` prune partitions before any file is opened.
+    Origin and Destination (which the files don't repeat) are rebuilt from the route partition key."""
+    filters = []
+    if routes:
+        filters.append(('route', 'in', list(routes)))
+    if dates:
+        filters.append(('date', 'in', list(dates)))
+    read = None if columns is None else (
+        [c for c in columns if c not in ('Origin', 'Destination')] + [c for c in ('route', 'date') if c not in columns])
+    with timer("store_read"):
+        df = pd.read_parquet(store_dir, columns=read, filters=filters or None)
+    # Partition keys come back as categoricals: split the few distinct routes, then broadcast by code
+    route = df['route'].astype('category')
+    ends = pd.Series(route.cat.categories.astype(str)).str.partition('-')
+    codes = route.cat.codes.to_numpy()
+    for name, part in (('Origin', 0), ('Destination', 2)):
+        if columns is None or name in columns:
+            df[name] = pd.Categorical(ends[part].to_numpy()[codes])
+    if (columns is None or 'Date' in columns) and 'Date' not in df.columns:
+        df['Date'] = df['date'].astype(str)
+    # Callers only want the data columns
+    return df.drop(columns=[c for c in ('route', 'date') if not (columns and c in columns)])
+
+def _read_route_csvs(routes_dir):
+    """Concatenate the batch scraper's per-route CSV partitions (SFO-LAX.csv, ...)."""
+    frames = []
+    for name in sorted(os.listdir(routes_dir)):
+        if not name.endswith('.csv'):
+            continue
+        frame = pd.read_csv(os.path.join(routes_dir, name))
+        if 'Origin' not in frame.columns and '-' in name:
+            frame['Origin'], frame['Destination'] = name[:-4].split('-', 1)
+        frames.append(frame)
+    return pd.concat(frames, ignore_index=True) if frames else pd.DataFrame(columns=[
+        'Departure Time', 'Arrival Time', 'Airline Company', 'Flight Duration', 'Stops', 'Price',
+        'co2 emissions', 'emissions variation', 'Date', 'Origin', 'Destination'])
+
+def load_flight_frame(path):
+    """Read flights from a scraper CSV, a folder of per-route CSVs, or a Parquet store directory,
+    with numeric Price, CO2 and DurationMin."""
+    if os.path.isdir(path):
+        if any(name.endswith('.csv') for name in os.listdir(path)):
+            with timer("csv_read"):
+                df = _read_route_csvs(path)
+        else:
+            return load_flight_store(path)
+    else:
+        with timer("csv_read"):
+            df = pd.read_csv(path)
+    count("rows_parsed", len(df))
+    return _parse_flight_columns(df)
+
+# Cell values pd.read_csv reads as NaN that the scraper actually writes
+MISSING_TEXT = ['', 'N/A', 'NA', 'n/a', 'NaN', 'nan', 'null', 'None']
+
+def _parse_flight_columns(df):
+    with timer("parse_price"):
+        df['Price'] = parse_price_series(df['Price'])
+    with timer("parse_co2"):
+        df['CO2'] = parse_co2_series(df['co2 emissions'])
+    with timer("parse_duration"):
+        df['DurationMin'] = parse_duration_series(df['Flight Duration'])
+    return df
+
+def flight_frame(rows):
+    """Parsed flights from scraper row dicts, e.g. one day streamed from a running scrape.
+    Placeholder text becomes missing, as pd.read_csv would make it, so the result matches the CSV."""
+    df = pd.DataFrame(rows).replace(MISSING_TEXT, np.nan)
+    for column in ('Airline Company', 'Stops', 'Price', 'co2 emissions', 'Flight Duration'):
+        if column not in df.columns:
+            df[column] = None
+    return _parse_flight_columns(df)
+
+def _order(key, descending):
+    """Stable argsort that keeps NaN keys last in both directions."""
+    return np.argsort(-key if descending else key, kind='stable')
+
+class FlightTable:
+    """Parsed flights plus precomputed sort orders, for paging through the data server-side."""
+
+    SORT_KEYS = ('price', 'duration', 'departure')
+
+    def __init__(self, df):
+        self.df = df.reset_index(drop=True)
+        price = self.df['Price'].to_numpy(dtype=float)
+        duration = self.df['DurationMin'].to_numpy(dtype=float)
+        departure = parse_clock_series(self.df['Departure Time']).to_numpy()
+        if 'Date' in self.df.columns:
+            # Departure sorts by date first, then time of day
+            day = (pd.to_datetime(self.df['Date'], errors='coerce') - pd.Timestamp(0)).dt.days.to_numpy(dtype=float)
+            departure = day * 24 * 60 + departure
+        self.orders = {}
+        for name, key in (('price', price), ('duration', duration), ('departure', departure)):
+            self.orders[(name, False)] = _order(key, False)
+            self.orders[(name, True)] = _order(key, True)
+        self._airlines = self.df['Airline Company'].astype(str).str.lower().to_numpy()
+        self._stops = self.df['Stops'].astype(str).str.lower().to_numpy()
+        self._price = price
+        self._routes = None
+        if {'Origin', 'Destination'} <= set(self.df.columns):
+            self._routes = (self.df['Origin'].astype(str) + '-' + self.df['Destination'].astype(str)).str.upper().to_numpy()
+
+    def query(self, sort='price', descending=False, offset=0, limit=50,
+              airline=None, stops=None, date=None, min_price=None, max_price=None, route=None):
+        mask = np.ones(len(self.df), dtype=bool)
+        if route:
+            mask &= self._routes == route.upper() if self._routes is not None else False
+        if airline:
+            mask &= self._airlines == airline.lower()
+        if stops:
+            mask &= self._stops == stops.lower()
+        if date and 'Date' in self.df.columns:
+            mask &= (self.df['Date'] == date).to_numpy()
+        if min_price is not None:
+            mask &= self._price >= min_price
+        if max_price is not None:
+            mask &= self._price <= max_price
+        order = self.orders[(sort, descending)]
+        positions = order[mask[order]]
+        page = positions[offset:offset + limit]
+        next_offset = offset + limit if offset + limit < len(positions) else None
+        return {
+            'total': int(len(positions)),
+            'offset': offset,
+            'limit': limit,
+            'next_offset': next_offset,
+            'flights': self.df.iloc[page].fillna('N/A').to_dict(orient='records'),
+        }
+
+def build_flight_table(csv_path):
+    return FlightTable(load_flight_frame(csv_path))
+
+def histogram(values, bins='fd', max_bins=50):
+    """Bin values server-side: bins is a count or 'fd' (Freedman-Diaconis, capped at max_bins)."""
+    values = np.asarray(values, dtype=float)
+    values = values[np.isfinite(values)]
+    if values.size == 0:
+        return {'edges': [], 'counts': []}
+    if bins == 'fd':
+        edges = np.histogram_bin_edges(values, bins='fd')
+        if len(edges) - 1 > max_bins:
+            edges = np.histogram_bin_edges(values, bins=max_bins)
+    else:
+        edges = np.histogram_bin_edges(values, bins=int(bins))
+    counts, edges = np.histogram(values, bins=edges)
+    return {'edges': edges.tolist(), 'counts': counts.tolist()}
+
+def sample_scatter(df, x, y, max_points=500, stratify_by='Airline Company', seed=0):
+    """Downsample (x, y) pairs to about max_points, keeping each stratum's share of the data."""
+    points = df[[x, y, stratify_by]].dropna(subset=[x, y])
+    if len(points) > max_points:
+        points = points.groupby(stratify_by, dropna=False, observed=True).sample(
+            frac=max_points / len(points), random_state=seed)
+    return points[[x, y]].to_dict(orient='records')
+
+def _rows(frame):
+    """Records with NaN/NaT as None, so results serialize as JSON null without a post-pass."""
+    return frame.astype(object).where(frame.notna(), None).to_dict(orient='records')
+
+def _records(frame, date_columns=()):
+    frame = frame.reset_index()
+    for column in date_columns:
+        frame[column] = frame[column].dt.strftime('%Y-%m-%d' if column == 'Date' else '%Y-%m-%dT%H:%M')
+    return _rows(frame.round(2))
+
+def compute_price_trends(history, route=None, start_date=None, end_date=None, smooth=3):
+    """Price trends over the scrape history (see history.load_history):
+
+    - by_departure_date: min/median price per departure date, from the latest snapshot of each day
+    - by_scrape: median price across everything seen in each scrape (hourly buckets)
+    - movement: how each departure date's median moved from its first to its latest snapshot
+    - days_to_departure: min/median price by days between scrape and departure
+    Medians also get a centered rolling median over `smooth` points.
+    """
+    df = history
+    if route:
+        origin, _, destination = route.upper().partition('-')
+        df = df[(df['Origin'] == origin) & (df['Destination'] == destination)]
+    if start_date:
+        df = df[df['Date'] >= pd.Timestamp(start_date)]
+    if end_date:
+        df = df[df['Date'] <= pd.Timestamp(end_date)]
+    df = df.dropna(subset=['Price', 'Date', 'Scraped At'])
+    if df.empty:
+        return {'by_departure_date': [], 'by_scrape': [], 'movement': [], 'days_to_departure': [],
+                'rows': 0, 'snapshots': 0}
+    scraped_hour = df['Scraped At'].dt.floor('h')
+    price = df['Price'].astype(float)
+
+    latest = df['Scraped At'] == df.groupby(['Origin', 'Destination', 'Date'], observed=True)['Scraped At'].transform('max')
+    by_date = price[latest].groupby(df.loc[latest, 'Date']).agg(['min', 'median', 'count'])
+    by_date['median_smoothed'] = by_date['median'].rolling(smooth, center=True, min_periods=1).median()
+
+    by_scrape = price.groupby(scraped_hour.rename('Scraped At')).agg(['min', 'median', 'count'])
+
+    snapshots = price.groupby([df['Date'], scraped_hour.rename('Scraped At')]).median()
+    movement = snapshots.groupby(level='Date').agg(['first', 'last', 'count'])
+    movement.columns = ['first_median', 'latest_median', 'snapshots']
+    movement['change_pct'] = (movement['latest_median'] / movement['first_median'] - 1) * 100
+
+    days_out = (df['Date'] - df['Scraped At'].dt.normalize()).dt.days.rename('days_to_departure')
+    curve = price[days_out >= 0].groupby(days_out[days_out >= 0]).agg(['min', 'median', 'count'])
+    curve['median_smoothed'] = curve['median'].rolling(smooth, center=True, min_periods=1).median()
+
+    return {
+        'by_departure_date': _records(by_date, ['Date']),
+        'by_scrape': _records(by_scrape, ['Scraped At']),
+        'movement': _records(movement, ['Date']),
+        'days_to_departure': _records(curve),
+        'rows': int(len(df)),
+        'snapshots': int(scraped_hour.nunique()),
+    }
+
 def process_data(data):
     # Convert JSON to DataFrame
     df = pd.DataFrame(data)
@@ -52,55 +313,46 @@ def process_data(data):
         # Add price trends, peak days, etc.
     }
 
-def process_flight_csv(csv_path):
-    df = pd.read_csv(csv_path)
-    
-    # Clean and parse columns with error handling
-    df['Price'] = df['Price'].apply(parse_price)
-    df['CO2'] = df['co2 emissions'].apply(parse_co2)
-    df['DurationMin'] = df['Flight Duration'].apply(parse_duration)
-    
-    # Filter out rows with invalid price data for calculations
-    valid_price_df = df.dropna(subset=['Price'])
-    valid_co2_df = df.dropna(subset=['CO2'])
-    
-    # Top airlines by avg price (only valid prices)
-    if not valid_price_df.empty:
-        top_airlines = valid_price_df.groupby('Airline Company')['Price'].mean().reset_index().sort_values('Price').to_dict(orient='records')
-        price_hist = valid_price_df['Price'].tolist()
-        top_cheapest = valid_price_df.sort_values('Price').head(5).to_dict(orient='records')
-    else:
-        top_airlines = []
-        price_hist = []
-        top_cheapest = []
+def process_flight_csv(csv_path, include_all_flights=False, bins='fd', max_scatter_points=500, chunksize=None):
+    if chunksize and not include_all_flights and not os.path.isdir(csv_path):
+        return process_flight_csv_chunked(csv_path, bins, max_scatter_points, chunksize)
+    return summarize_flights(load_flight_frame(csv_path), include_all_flights, bins, max_scatter_points)
+
+def process_flight_store(store_dir, include_all_flights=False, bins='fd', max_scatter_points=500, routes=None, dates=None):
+    """Same analytics as process_flight_csv, read from the Parquet store instead of re-parsing CSV text."""
+    df = load_flight_store(store_dir, routes=routes, dates=dates)
+    return summarize_flights(df, include_all_flights, bins, max_scatter_points)
+
+@timed("summarize")
+def summarize_flights(df, include_all_flights=False, bins='fd', max_scatter_points=500):
+    # NaN prices/CO2 are skipped by the groupby means and nsmallest, so no filtered copies of df are made
+    top_airlines = df.groupby('Airline Company', observed=True)['Price'].mean().dropna().sort_values()
+    top_airlines = top_airlines.reset_index().to_dict(orient='records')
+    price_hist = histogram(df['Price'], bins)
+    top_cheapest = _rows(df.nsmallest(5, 'Price'))
     
     # Duration distribution
-    duration_hist = df['DurationMin'].dropna().tolist()
+    duration_hist = histogram(df['DurationMin'], bins)
     
     # CO2 by airline (only valid CO2 data)
-    if not valid_co2_df.empty:
-        co2_by_airline = valid_co2_df.groupby('Airline Company')['CO2'].mean().reset_index().to_dict(orient='records')
-    else:
-        co2_by_airline = []
+    co2_by_airline = df.groupby('Airline Company', observed=True)['CO2'].mean().dropna().reset_index().to_dict(orient='records')
     
     # Flights per airline
     flights_per_airline = df['Airline Company'].value_counts().reset_index().rename(columns={'index': 'Airline', 'Airline Company': 'Count'}).to_dict(orient='records')
     # Stops analysis
     stops_count = df['Stops'].value_counts().to_dict()
     # Price vs CO2 (only valid data)
-    price_vs_co2 = df[['Price', 'CO2']].dropna().to_dict(orient='records')
+    price_vs_co2 = sample_scatter(df, 'Price', 'CO2', max_scatter_points)
     # Earliest/latest flights
-    earliest = df.iloc[0].to_dict() if not df.empty else {}
-    latest = df.iloc[-1].to_dict() if not df.empty else {}
-    # All flights (for full table) - replace NaN with None for JSON compatibility
-    all_flights = df.fillna('N/A').to_dict(orient='records')
+    earliest = _rows(df.head(1))[0] if not df.empty else {}
+    latest = _rows(df.tail(1))[0] if not df.empty else {}
     # Busiest day (date with most flights)
     busiest_day = None
     if 'Date' in df.columns:
         day_counts = df['Date'].value_counts()
         if not day_counts.empty:
             busiest_day = day_counts.idxmax()
-    return {
+    result = {
         'top_airlines': top_airlines,
         'price_hist': price_hist,
         'duration_hist': duration_hist,
@@ -113,6 +365,176 @@ def process_flight_csv(csv_path):
         'top_cheapest': top_cheapest,
         'total_flights': len(df),
         'sample_data': df.head(5).fillna('N/A').to_dict(orient='records'),
-        'all_flights': all_flights,
         'busiest_day': busiest_day
     }
+    # The full table is served page by page from /api/flights; only inline it when asked
+    if include_all_flights:
+        with timer("all_flights_records"):
+            result['all_flights'] = df.fillna('N/A').to_dict(orient='records')
+    return result
+
+# Mergeable partial aggregates. A partial summarizes any slice of the flights (a CSV chunk, a store
+# partition) with counts, sums, mins, maxes and a few rows, and merging partials in data order gives
+# exactly the partial of the whole. Large files are reduced chunk by chunk without ever being loaded.
+PARTIAL_TOP_ROWS = 5
+# Scatter candidates kept per partial; sample_scatter picks the chart's points from these
+PARTIAL_SCATTER_POINTS = 2000
+# Example rows kept per airline, for prompts that need a few concrete flights
+PARTIAL_SAMPLE_PER_AIRLINE = 4
+SAMPLE_COLUMNS = ['Date', 'Departure Time', 'Airline Company', 'Stops', 'DurationMin', 'Price', 'CO2']
+# Compact dtypes for chunked reads: repeated strings as categoricals, parsed numbers as float32
+CSV_CATEGORIES = {'Airline Company': 'category', 'Stops': 'category'}
+
+def _value_counts(values):
+    counts = values.dropna().value_counts()
+    return {repr(float(v)): int(c) for v, c in counts.items() if c}
+
+@timed("partial")
+def flight_partial(df):
+    """Partial aggregates for a slice of parsed flights (see merge_partials)."""
+    # Sums are taken in float64 even when the columns were read as float32
+    numbers = df[['Airline Company']].assign(Price=df['Price'].astype(float), CO2=df['CO2'].astype(float))
+    per_airline = numbers.groupby('Airline Company', observed=True).agg(
+        count=('Airline Company', 'size'),
+        price_count=('Price', 'count'), price_sum=('Price', 'sum'),
+        price_min=('Price', 'min'), price_max=('Price', 'max'),
+        co2_count=('CO2', 'count'), co2_sum=('CO2', 'sum'),
+        co2_min=('CO2', 'min'), co2_max=('CO2', 'max'),
+    )
+    points = df[['Price', 'CO2', 'Airline Company']].dropna(subset=['Price', 'CO2'])
+    # Keyed by a hash of the whole row (not just the plotted values, which repeat) for a bottom-k sample
+    row_keys = pd.util.hash_pandas_object(df[[c for c in SAMPLE_COLUMNS if c in df.columns]], index=False)
+    points = points.assign(_key=row_keys.loc[points.index].to_numpy() >> 1)
+    days = df['Date'].value_counts(sort=False) if 'Date' in df.columns else pd.Series(dtype=int)
+    day_prices = (numbers['Price'].groupby(df['Date']).agg(
+        price_count='count', price_sum='sum', price_min='min', price_max='max')
+        if 'Date' in df.columns else pd.DataFrame())
+    routes = pd.Series(dtype=int)
+    if {'Origin', 'Destination'} <= set(df.columns):
+        routes = (df['Origin'].astype(str) + '-' + df['Destination'].astype(str)).value_counts()
+    sample = df[[c for c in SAMPLE_COLUMNS if c in df.columns]]
+    sample = sample.assign(_key=pd.util.hash_pandas_object(sample, index=False).to_numpy() >> 1)
+    sample = sample.sort_values('_key').groupby('Airline Company', observed=True).head(PARTIAL_SAMPLE_PER_AIRLINE)
+    return {
+        'rows': int(len(df)),
+        'days': {str(day): int(count) for day, count in days.items() if count},
+        'airlines': {str(airline): {k: (None if pd.isna(v) else float(v)) for k, v in stats.items()}
+                     for airline, stats in per_airline.to_dict(orient='index').items()},
+        'day_prices': {str(day): {k: (None if pd.isna(v) else float(v)) for k, v in stats.items()}
+                       for day, stats in day_prices.to_dict(orient='index').items()},
+        'routes': {str(k): int(v) for k, v in routes.items() if v},
+        'stops': {str(k): int(v) for k, v in df['Stops'].value_counts().items() if v},
+        'prices': _value_counts(df['Price']),
+        'durations': _value_counts(df['DurationMin']),
+        'cheapest': _rows(df.nsmallest(PARTIAL_TOP_ROWS, 'Price')),
+        'head': _rows(df.head(PARTIAL_TOP_ROWS)),
+        'last': _rows(df.tail(1)),
+        # Bottom-k by row hash, like 'sample': merging keeps a uniform sample of the union
+        'scatter': _rows(points.nsmallest(PARTIAL_SCATTER_POINTS, '_key')),
+        'scatter_total': int(len(points)),
+        'sample': {str(airline): _rows(rows) for airline, rows in sample.groupby('Airline Company', observed=True)},
+    }
+
+def _merge_stats(total, stats):
+    for key, value in stats.items():
+        if value is None:
+            continue
+        if key.endswith('_min'):
+            total[key] = value if total.get(key) is None else min(total[key], value)
+        elif key.endswith('_max'):
+            total[key] = value if total.get(key) is None else max(total[key], value)
+        else:
+            total[key] = total.get(key, 0) + value
+
+def _add_counts(total, counts):
+    for key, n in counts.items():
+        total[key] = total.get(key, 0) + n
+
+def merge_partials(partials):
+    """Combine partials, given in data order, into the partial of their concatenation."""
+    merged = {'rows': 0, 'days': {}, 'day_prices': {}, 'routes': {}, 'airlines': {}, 'stops': {}, 'prices': {},
+              'durations': {}, 'cheapest': [], 'head': [], 'last': [], 'scatter': [], 'scatter_total': 0, 'sample': {}}
+    for part in partials:
+        merged['rows'] += part['rows']
+        for airline, rows in part['sample'].items():
+            # Bottom-k by row hash: the same rows win however the data is split or merged
+            rows = sorted(merged['sample'].get(airline, []) + rows, key=lambda r: r['_key'])
+            merged['sample'][airline] = rows[:PARTIAL_SAMPLE_PER_AIRLINE]
+        for airline, stats in part['airlines'].items():
+            _merge_stats(merged['airlines'].setdefault(airline, {}), stats)
+        for day, stats in part['day_prices'].items():
+            _merge_stats(merged['day_prices'].setdefault(day, {}), stats)
+        for field in ('days', 'routes', 'stops', 'prices', 'durations'):
+            _add_counts(merged[field], part[field])
+        merged['cheapest'] = sorted(merged['cheapest'] + part['cheapest'], key=lambda r: r['Price'])[:PARTIAL_TOP_ROWS]
+        merged['head'] += part['head'][:PARTIAL_TOP_ROWS - len(merged['head'])]
+        merged['last'] = part['last'] or merged['last']
+        # The smallest keys of the union are a uniform sample of it, whatever the split or merge order
+        merged['scatter'] = sorted(merged['scatter'] + part['scatter'],
+                                   key=lambda r: r['_key'])[:PARTIAL_SCATTER_POINTS]
+        merged['scatter_total'] += part['scatter_total']
+    return merged
+
+def _expand(counts):
+    values = np.array([float(v) for v in counts], dtype=float)
+    return np.repeat(values, np.array(list(counts.values()), dtype=np.int64))
+
+@timed("analytics_from_partial")
+def analytics_from_partial(partial, bins='fd', max_scatter_points=500):
+    """The summarize_flights payload (without all_flights) computed from a partial alone."""
+    airlines = sorted(partial['airlines'].items())
+    top_airlines = sorted(
+        ({'Airline Company': a, 'Price': s['price_sum'] / s['price_count']} for a, s in airlines if s.get('price_count')),
+        key=lambda r: r['Price'])
+    co2_by_airline = [{'Airline Company': a, 'CO2': s['co2_sum'] / s['co2_count']} for a, s in airlines if s.get('co2_count')]
+    by_count = sorted(airlines, key=lambda item: -item[1].get('count', 0))
+    scatter = pd.DataFrame(partial['scatter'], columns=['Price', 'CO2', 'Airline Company'])
+    days = partial['days']
+    return {
+        'top_airlines': top_airlines,
+        'price_hist': histogram(_expand(partial['prices']), bins),
+        'duration_hist': histogram(_expand(partial['durations']), bins),
+        'co2_by_airline': co2_by_airline,
+        'flights_per_airline': [{'Count': a, 'count': int(s['count'])} for a, s in by_count],
+        'stops_count': dict(sorted(partial['stops'].items(), key=lambda item: -item[1])),
+        'price_vs_co2': sample_scatter(scatter, 'Price', 'CO2', max_scatter_points),
+        'earliest_flight': partial['head'][0] if partial['head'] else {},
+        'latest_flight': partial['last'][0] if partial['last'] else {},
+        'top_cheapest': partial['cheapest'],
+        'total_flights': partial['rows'],
+        'sample_data': [{k: ('N/A' if v is None else v) for k, v in row.items()} for row in partial['head']],
+        'busiest_day': max(days, key=days.get) if days else None,
+    }
+
+def iter_flight_chunks(csv_path, chunksize=200_000, columns=None, float_dtype='float32'):
+    """Yield parsed chunks of a scraper CSV: categorical airline/stops and float32 (or float_dtype) Price,
+    CO2 and DurationMin. The raw text columns are parsed and kept only for the rows partials retain."""
+    chunks = pd.read_csv(csv_path, chunksize=chunksize, usecols=columns, dtype=CSV_CATEGORIES)
+    while True:
+        with timer("csv_read"):
+            chunk = next(chunks, None)
+        if chunk is None:
+            return
+        count("csv_chunks")
+        count("rows_parsed", len(chunk))
+        with timer("parse_price"):
+            chunk['Price'] = parse_price_series(chunk['Price']).astype(float_dtype)
+        with timer("parse_co2"):
+            chunk['CO2'] = parse_co2_series(chunk['co2 emissions']).astype(float_dtype)
+        with timer("parse_duration"):
+            chunk['DurationMin'] = parse_duration_series(chunk['Flight Duration']).astype(float_dtype)
+        yield chunk
+
+def csv_partial(csv_path, chunksize=200_000, columns=None):
+    """Partial of a whole CSV, reading at most chunksize rows at a time."""
+    return merge_partials(flight_partial(chunk) for chunk in iter_flight_chunks(csv_path, chunksize, columns))
+
+def partial_delta(partial):
+    """The small, mergeable part of a partial that a client needs to update charts live: counts,
+    sums and mins per airline/stop/day and the cheapest rows, without value counts or samples."""
+    return {key: partial[key] for key in ('rows', 'days', 'day_prices', 'airlines', 'stops', 'cheapest')}
+
+def process_flight_csv_chunked(csv_path, bins='fd', max_scatter_points=500, chunksize=200_000, columns=None):
+    """process_flight_csv with memory bounded by chunksize instead of the file size. Every output
+    matches except price_vs_co2, which is drawn from a bounded sample; all_flights is not available."""
+    return analytics_from_partial(csv_partial(csv_path, chunksize, columns), bins, max_scatter_points)
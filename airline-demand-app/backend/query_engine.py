@@ -0,0 +1,280 @@
+import json
+import os
+import sqlite3
+import threading
+from functools import lru_cache
+
+import pandas as pd
+
+from metrics import count, timer
+from processor import iter_flight_chunks, parse_clock_series
+from summary import CSV_CHUNKSIZE, data_signature, data_units
+
+# Bumped whenever the schema changes; an older database is dropped and re-ingested
+SCHEMA_VERSION = 2
+# Prepared statements kept per connection; SQL text is built deterministically so repeats hit the cache
+STATEMENT_CACHE = 256
+
+# Scraper column -> table column; Price, CO2 and DurationMin arrive already parsed, Route, Weekday and
+# DepartureHour are derived at ingest (_derive) so grouping by them can use an index
+COLUMNS = {
+    'Origin': 'origin', 'Destination': 'destination', 'Date': 'date', 'Airline Company': 'airline',
+    'Stops': 'stops', 'Departure Time': 'departure_time', 'Price': 'price', 'CO2': 'co2',
+    'DurationMin': 'duration_min', 'Scraped At': 'scraped_at',
+    'Route': 'route', 'Weekday': 'weekday', 'DepartureHour': 'departure_hour',
+}
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS units (id INTEGER PRIMARY KEY, name TEXT UNIQUE NOT NULL, signature TEXT NOT NULL);
+CREATE TABLE IF NOT EXISTS meta (key TEXT PRIMARY KEY, value TEXT);
+CREATE TABLE IF NOT EXISTS flights (
+    unit_id INTEGER NOT NULL, origin TEXT, destination TEXT, date TEXT, airline TEXT, stops TEXT,
+    departure_time TEXT, price REAL, co2 REAL, duration_min REAL, scraped_at TEXT,
+    route TEXT, weekday INTEGER, departure_hour INTEGER
+);
+"""
+# Created after the first bulk load (cheaper than maintaining them row by row); (x, price) pairs cover
+# the common "price by x" aggregates without touching the table
+INDEXES = {
+    'idx_flights_unit': 'unit_id',
+    'idx_flights_airline': 'airline, price',
+    'idx_flights_stops': 'stops, price',
+    'idx_flights_date': 'date, price',
+    'idx_flights_origin': 'origin, destination, date',
+    'idx_flights_route': 'route, price',
+    'idx_flights_weekday': 'weekday, price',
+    'idx_flights_departure_hour': 'departure_hour, price',
+    'idx_flights_price': 'price',
+}
+
+# Whitelisted query vocabulary: request names -> SQL expressions. Nothing else reaches the SQL text.
+DIMENSIONS = {
+    'airline': 'airline',
+    'stops': 'stops',
+    'date': 'date',
+    'origin': 'origin',
+    'destination': 'destination',
+    'route': 'route',
+    'weekday': 'weekday',  # 0 = Sunday
+    'departure_hour': 'departure_hour',
+}
+AGGREGATES = {
+    'count': 'COUNT(*)',
+    'avg_price': 'AVG(price)',
+    'min_price': 'MIN(price)',
+    'max_price': 'MAX(price)',
+    'avg_co2': 'AVG(co2)',
+    'avg_duration': 'AVG(duration_min)',
+    'min_duration': 'MIN(duration_min)',
+}
+# Nearest-rank price percentiles (SQLite has no percentile aggregate; see prices_sql)
+PERCENTILES = {f'p{p}_price': p for p in (10, 25, 50, 75, 90, 95, 99)}
+METRICS = list(AGGREGATES) + list(PERCENTILES)
+# filter name -> SQL condition; a filter given several values matches any of them
+FILTERS = {
+    'airline': 'airline = ?',
+    'stops': 'stops = ?',
+    'origin': 'origin = ?',
+    'destination': 'destination = ?',
+    'route': 'route = ?',
+    'date_from': 'date >= ?',
+    'date_to': 'date <= ?',
+    'min_price': 'price >= ?',
+    'max_price': 'price <= ?',
+}
+
+_ingest_lock = threading.Lock()
+_local = threading.local()
+
+
+def database_path(data_path):
+    """The database lives next to the data: flight_data.csv -> flight_data.sqlite."""
+    data_path = os.path.normpath(data_path)
+    root, ext = os.path.splitext(data_path)
+    return (root if ext == '.csv' else data_path) + '.sqlite'
+
+
+def _connect(db_path):
+    conn = sqlite3.connect(db_path, cached_statements=STATEMENT_CACHE, check_same_thread=False)
+    conn.execute('PRAGMA journal_mode=WAL')
+    conn.execute('PRAGMA synchronous=NORMAL')
+    conn.execute('PRAGMA temp_store=MEMORY')
+    conn.execute('PRAGMA mmap_size=268435456')
+    return conn
+
+
+def connection(db_path):
+    """One connection per thread and database, so each keeps its own statement cache warm."""
+    connections = getattr(_local, 'connections', None)
+    if connections is None:
+        connections = _local.connections = {}
+    if db_path not in connections:
+        connections[db_path] = _connect(db_path)
+    return connections[db_path]
+
+
+def _unit_frames(name, path):
+    """Parsed rows of one unit (see summary.data_units), a bounded chunk at a time."""
+    if os.path.isdir(path):
+        df = pd.read_parquet(path)
+        df['Origin'], _, df['Destination'] = os.path.basename(os.path.dirname(path)).partition('=')[2].partition('-')
+        df['Date'] = os.path.basename(path).partition('=')[2]
+        yield df
+        return
+    # float64: answers carry the prices as scraped, not their float32 roundings
+    for chunk in iter_flight_chunks(path, CSV_CHUNKSIZE, float_dtype='float64'):
+        # Per-route CSVs from older scrapes only carry the route in their file name (SFO-LAX.csv)
+        if 'Origin' not in chunk.columns and '-' in name:
+            chunk['Origin'], chunk['Destination'] = name[:-4].split('-', 1)
+        yield chunk
+
+
+def _derive(df):
+    """Route, weekday (0 = Sunday) and departure hour as columns of their own, NULL where unknown."""
+    if {'Origin', 'Destination'} <= set(df.columns):
+        df['Route'] = df['Origin'].astype(str) + '-' + df['Destination'].astype(str)
+    if 'Date' in df.columns:
+        df['Weekday'] = (pd.to_datetime(df['Date'], errors='coerce').dt.dayofweek + 1) % 7
+    if 'Departure Time' in df.columns:
+        df['DepartureHour'] = parse_clock_series(df['Departure Time']) // 60
+    for column in ('Weekday', 'DepartureHour'):
+        if column in df.columns:
+            df[column] = df[column].astype('Int64').astype(object).where(df[column].notna(), None)
+    return df
+
+
+def _rows(unit_id, df):
+    df = _derive(df)
+    columns = [df[c] if c in df.columns else pd.Series(None, index=df.index, dtype=object) for c in COLUMNS]
+    # Plain Python values; NaN binds as NULL
+    values = [c.astype(object).where(c.notna(), None).tolist() if c.dtype.name == 'category' else c.tolist()
+              for c in columns]
+    return ((unit_id, *row) for row in zip(*values))
+
+
+def _reset(conn):
+    conn.executescript('DROP TABLE IF EXISTS flights; DROP TABLE IF EXISTS units; DROP TABLE IF EXISTS meta;')
+    conn.executescript(SCHEMA)
+    conn.execute(f'PRAGMA user_version = {SCHEMA_VERSION}')
+
+
+def ingest(data_path):
+    """Bring the database for data_path up to date and return its path.
+
+    Like the summary file, only units (the CSV, per-route CSVs, store partitions) whose fingerprint
+    changed are re-read; each is replaced in one transaction, so queries never see half a unit.
+    """
+    db_path = database_path(data_path)
+    with _ingest_lock, timer('query_ingest'):
+        conn = connection(db_path)
+        if conn.execute('PRAGMA user_version').fetchone()[0] != SCHEMA_VERSION:
+            _reset(conn)
+        source = json.dumps(data_signature(data_path))
+        if conn.execute("SELECT value FROM meta WHERE key = 'source'").fetchone() == (source,):
+            return db_path
+        known = dict(conn.execute('SELECT name, signature FROM units'))
+        units = data_units(data_path)
+        placeholders = ', '.join('?' * (len(COLUMNS) + 1))
+        for name, path in units.items():
+            try:
+                signature = json.dumps(data_signature(path))
+            except FileNotFoundError:  # replaced by the scraper mid-listing
+                continue
+            if known.get(name) == signature:
+                continue
+            with conn:
+                conn.execute('DELETE FROM flights WHERE unit_id IN (SELECT id FROM units WHERE name = ?)', (name,))
+                conn.execute('INSERT INTO units (name, signature) VALUES (?, ?) '
+                             'ON CONFLICT(name) DO UPDATE SET signature = excluded.signature', (name, signature))
+                unit_id = conn.execute('SELECT id FROM units WHERE name = ?', (name,)).fetchone()[0]
+                for df in _unit_frames(name, path):
+                    conn.executemany(f'INSERT INTO flights VALUES ({placeholders})', _rows(unit_id, df))
+                    count('query_rows_ingested', len(df))
+        with conn:
+            for name in set(known) - set(units):
+                conn.execute('DELETE FROM flights WHERE unit_id IN (SELECT id FROM units WHERE name = ?)', (name,))
+                conn.execute('DELETE FROM units WHERE name = ?', (name,))
+            for index, columns in INDEXES.items():
+                conn.execute(f'CREATE INDEX IF NOT EXISTS {index} ON flights ({columns})')
+            conn.execute("INSERT OR REPLACE INTO meta VALUES ('source', ?)", (source,))
+        # Refresh planner statistics for the new data
+        conn.execute('PRAGMA optimize')
+    return db_path
+
+
+def _where(filters):
+    return ' AND '.join('(' + ' OR '.join([f'({FILTERS[name]})'] * n) + ')' for name, n in filters) or '1'
+
+
+@lru_cache(maxsize=256)
+def build_sql(group_by, metrics, filters, order_by, descending, paginate=True):
+    """SQL text for a query shape; filters is a tuple of (filter name, number of values). Only
+    whitelisted names are interpolated; filter values, limit and offset are always parameters, so one
+    shape maps to one cached prepared statement. Percentiles aren't computed here (see prices_sql)."""
+    select = [f'{DIMENSIONS[name]} AS {name}' for name in group_by]
+    select += [f'{AGGREGATES[name]} AS {name}' for name in metrics if name in AGGREGATES]
+    sql = f"SELECT {', '.join(select)} FROM flights WHERE {_where(filters)}"
+    if group_by:
+        sql += f" GROUP BY {', '.join(str(i + 1) for i in range(len(group_by)))}"
+    order = order_by or (group_by[0] if group_by else None)
+    if order:
+        sql += f" ORDER BY {order} {'DESC' if descending else 'ASC'}"
+    return sql + ' LIMIT ? OFFSET ?' if paginate else sql
+
+
+@lru_cache(maxsize=256)
+def prices_sql(group_by, filters):
+    """The known prices within one group, ascending. Every percentile of the group comes from this one
+    ordered pass, which a (dimension, price) index hands over without sorting."""
+    groups = ''.join(f' AND {DIMENSIONS[name]} IS ?' for name in group_by)
+    return f'SELECT price FROM flights WHERE {_where(filters)}{groups} AND price IS NOT NULL ORDER BY price'
+
+
+def _nearest_rank(percentile, n):
+    return max(1, -(-percentile * n // 100))
+
+
+def query(data_path, group_by=(), metrics=('count',), filters=None, order_by=None, descending=False,
+          limit=100, offset=0):
+    """Run a whitelisted aggregate query over the ingested flights. Raises ValueError for names
+    outside DIMENSIONS/METRICS/FILTERS. filters maps a filter name to a value or a list of values
+    (any of which may match)."""
+    group_by, metrics = tuple(group_by), tuple(metrics) or ('count',)
+    unknown = ([d for d in group_by if d not in DIMENSIONS] + [m for m in metrics if m not in METRICS] +
+               [f for f in (filters or {}) if f not in FILTERS])
+    if unknown:
+        raise ValueError(f"Unknown query fields: {', '.join(unknown)}")
+    if order_by and order_by not in group_by + metrics:
+        raise ValueError(f"order_by must be one of the selected dimensions or metrics, not '{order_by}'")
+    shape, params = [], []
+    for name, value in sorted((filters or {}).items()):
+        values = list(value) if isinstance(value, (list, tuple)) else [value]
+        if name == 'route':
+            values = [str(v).upper() for v in values]
+            if any(len(v.split('-')) != 2 for v in values):
+                raise ValueError("route must look like ORIGIN-DEST, e.g. DEL-BOM")
+        shape.append((name, len(values)))
+        params += values
+    shape = tuple(shape)
+    percentiles = [m for m in metrics if m in PERCENTILES]
+    # Ordering by a percentile needs every group's value first; otherwise SQL orders and pages
+    sort_later = order_by in PERCENTILES
+    sql = build_sql(group_by, metrics, shape, None if sort_later else order_by, descending, not sort_later)
+    db_path = ingest(data_path)
+    with timer('query'):
+        conn = connection(db_path)
+        cursor = conn.execute(sql, params if sort_later else params + [limit, offset])
+        names = [c[0] for c in cursor.description]
+        rows = [dict(zip(names, row)) for row in cursor]
+        if percentiles:
+            # Only the groups being returned (all of them when sorting by a percentile)
+            sql = prices_sql(group_by, shape)
+            for row in rows:
+                prices = [price for price, in conn.execute(sql, params + [row[name] for name in group_by])]
+                for name in percentiles:
+                    row[name] = prices[_nearest_rank(PERCENTILES[name], len(prices)) - 1] if prices else None
+        if sort_later:
+            # Groups without prices sort last either way
+            known = sorted((r for r in rows if r[order_by] is not None), key=lambda r: r[order_by], reverse=descending)
+            rows = (known + [r for r in rows if r[order_by] is None])[offset:offset + limit]
+    columns = list(group_by) + list(metrics)
+    return {'columns': columns, 'rows': [{c: row[c] for c in columns} for row in rows]}
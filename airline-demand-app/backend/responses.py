@@ -0,0 +1,96 @@
+import hashlib
+import json
+import os
+from email.utils import formatdate, parsedate_to_datetime
+
+import numpy as np
+from fastapi.responses import Response
+from starlette.middleware.gzip import GZipMiddleware
+
+from metrics import timer
+
+try:
+    import orjson
+except ImportError:  # optional dependency: falls back to the stdlib encoder
+    orjson = None
+
+try:
+    from brotli_asgi import BrotliMiddleware
+except ImportError:  # optional dependency: RESPONSE_COMPRESSION=br falls back to gzip
+    BrotliMiddleware = None
+
+
+def _default(obj):
+    """Types the stdlib encoder can't handle; orjson covers these natively."""
+    if isinstance(obj, np.generic):
+        return obj.item()
+    if hasattr(obj, 'isoformat'):
+        return obj.isoformat()
+    return str(obj)
+
+
+def dumps(content):
+    if orjson is not None:
+        # NaN/inf become null, numpy scalars/arrays and datetimes serialize directly
+        return orjson.dumps(content, option=orjson.OPT_SERIALIZE_NUMPY | orjson.OPT_NON_STR_KEYS)
+    return json.dumps(content, default=_default, separators=(',', ':')).encode('utf-8')
+
+
+class FastJSONResponse(Response):
+    """JSON response encoded in one pass by orjson.
+
+    Return it from an endpoint directly: FastAPI then skips jsonable_encoder, so results are
+    expected to be plain dicts/lists (processor.py already turns NaN into None).
+    """
+
+    media_type = 'application/json'
+
+    def render(self, content):
+        with timer("serialize"):
+            return dumps(content)
+
+
+def etag(*version):
+    """Weak validator for a response derived from version (data fingerprint, query parameters...).
+    Weak, because the compression middleware may re-encode the bytes of an equivalent body."""
+    return 'W/"' + hashlib.blake2b(repr(version).encode('utf-8'), digest_size=16).hexdigest() + '"'
+
+
+def validators(tag, modified_ns=None):
+    """ETag, Last-Modified and a Cache-Control that makes browsers revalidate before reusing a copy."""
+    headers = {'ETag': tag, 'Cache-Control': 'no-cache'}
+    if modified_ns:
+        headers['Last-Modified'] = formatdate(modified_ns / 1e9, usegmt=True)
+    return headers
+
+
+def is_fresh(request_headers, tag, modified_ns=None):
+    """Whether the client's copy is current: If-None-Match when sent (weak comparison), otherwise
+    If-Modified-Since against modified_ns (HTTP dates have one-second resolution)."""
+    if_none_match = request_headers.get('if-none-match')
+    if if_none_match is not None:
+        opaque = tag.removeprefix('W/')
+        return any(t.strip().removeprefix('W/') in ('*', opaque) for t in if_none_match.split(','))
+    if_modified_since = request_headers.get('if-modified-since')
+    if if_modified_since and modified_ns:
+        try:
+            return modified_ns // 10**9 <= parsedate_to_datetime(if_modified_since).timestamp()
+        except (TypeError, ValueError):
+            return False
+    return False
+
+
+def not_modified(headers):
+    return Response(status_code=304, headers=headers)
+
+
+def add_compression(app, mode=None, minimum_size=1024):
+    """RESPONSE_COMPRESSION=gzip (default), br or off. Only bodies over minimum_size are compressed."""
+    mode = (mode or os.getenv('RESPONSE_COMPRESSION', 'gzip')).lower()
+    if mode == 'br' and BrotliMiddleware is not None:
+        app.add_middleware(BrotliMiddleware, minimum_size=minimum_size)
+    elif mode in ('br', 'gzip'):
+        if mode == 'br':
+            print('brotli-asgi is not installed; compressing with gzip')
+        app.add_middleware(GZipMiddleware, minimum_size=minimum_size)
+    return mode
@@ -0,0 +1,143 @@
+import json
+import os
+import threading
+
+import pandas as pd
+
+from cache import file_fingerprint
+from metrics import count, timed
+from processor import analytics_from_partial, csv_partial, flight_partial, merge_partials
+
+# Bumped whenever the partial layout changes so old summary files are rebuilt, not misread
+SUMMARY_VERSION = 5
+CSV_CHUNKSIZE = int(os.getenv("SUMMARY_CSV_CHUNKSIZE", "200000"))
+DEFAULT_BINS = 'fd'
+DEFAULT_SCATTER_POINTS = 500
+
+_lock = threading.Lock()
+
+
+def summary_path(data_path):
+    """The summary artifact lives next to the data: flight_data.csv -> flight_data.summary.json."""
+    data_path = os.path.normpath(data_path)
+    root, ext = os.path.splitext(data_path)
+    return (root if ext == '.csv' else data_path) + '.summary.json'
+
+
+def data_signature(path):
+    # JSON round trip so a freshly computed fingerprint compares equal to one read back from disk
+    return json.loads(json.dumps(file_fingerprint(path)))
+
+
+def data_units(data_path):
+    """Independently re-readable pieces of a data source: the CSV itself, each per-route CSV,
+    or each route=/date= partition of the Parquet store."""
+    if not os.path.isdir(data_path):
+        return {os.path.basename(data_path): data_path}
+    names = sorted(os.listdir(data_path))
+    if any(name.endswith('.csv') for name in names):
+        return {name: os.path.join(data_path, name) for name in names if name.endswith('.csv')}
+    units = {}
+    for route in names:
+        route_dir = os.path.join(data_path, route)
+        if route.startswith('route=') and os.path.isdir(route_dir):
+            for day in sorted(os.listdir(route_dir)):
+                if day.startswith('date='):
+                    units[f'{route}/{day}'] = os.path.join(route_dir, day)
+    return units
+
+
+def unit_partial(path):
+    """Partial aggregates for one unit; CSVs are reduced chunk by chunk so memory stays bounded."""
+    if os.path.isdir(path):
+        df = pd.read_parquet(path)
+        # Store partitions carry the route in their path (route=DEL-BOM/date=...), not in the rows
+        route = os.path.basename(os.path.dirname(path)).partition('=')[2]
+        df['Origin'], _, df['Destination'] = route.partition('-')
+        return flight_partial(df)
+    return csv_partial(path, CSV_CHUNKSIZE)
+
+
+def merge_summary(units):
+    return merge_partials(unit['partial'] for unit in units.values())
+
+
+def _read(path):
+    try:
+        with open(path, encoding='utf-8') as f:
+            summary = json.load(f)
+    except (OSError, ValueError):
+        return None
+    return summary if summary.get('version') == SUMMARY_VERSION else None
+
+
+def _write(path, summary):
+    # Per process: analytics pool workers may rebuild the same summary as the server
+    tmp_path = f'{path}.{os.getpid()}.tmp'
+    with open(tmp_path, 'w', encoding='utf-8') as f:
+        # dumps goes through the C encoder; dump(f) would stream through the pure-Python one
+        f.write(json.dumps(summary, default=str))
+    os.replace(tmp_path, path)
+
+
+@timed("summary_build")
+def materialize_summary(data_path):
+    """Bring the summary artifact for data_path up to date and return it.
+
+    Only units whose fingerprint changed since the last run (a rewritten CSV, a store partition the
+    scraper just replaced) are re-read; every other unit's partials are reused as they are, and units
+    that disappeared are dropped. The default analyze payload is then derived from the merged partials
+    (see processor.merge_partials).
+    """
+    path = summary_path(data_path)
+    with _lock:
+        previous = _read(path) or {'units': {}}
+        units = {}
+        for name, unit_path in data_units(data_path).items():
+            try:
+                signature = data_signature(unit_path)
+            except FileNotFoundError:  # replaced by the scraper mid-listing
+                continue
+            cached = previous['units'].get(name)
+            if cached and cached['signature'] == signature:
+                units[name] = cached
+            else:
+                count("summary_units_rebuilt")
+                units[name] = {'signature': signature, 'partial': unit_partial(unit_path)}
+        return _save(data_path, units)
+
+
+def _save(data_path, units):
+    summary = {
+        'version': SUMMARY_VERSION,
+        'source': data_signature(data_path),
+        'units': units,
+        'analytics': analytics_from_partial(merge_summary(units), DEFAULT_BINS, DEFAULT_SCATTER_POINTS),
+    }
+    _write(summary_path(data_path), summary)
+    return summary
+
+
+@timed("summary_build")
+def materialize_from_partial(data_path, partial):
+    """Write the summary of a single CSV whose partial is already known, e.g. merged from the per-day
+    partials of a scrape whose rows are still in memory, without reading the file back."""
+    with _lock:
+        return _save(data_path, {os.path.basename(data_path): {'signature': data_signature(data_path), 'partial': partial}})
+
+
+@timed("summary_read")
+def read_summary(data_path):
+    """The stored summary if it matches the current data_path, else None. Never rebuilds."""
+    summary = _read(summary_path(data_path))
+    return summary if summary is not None and summary['source'] == data_signature(data_path) else None
+
+
+def load_summary(data_path):
+    """The summary for the current version of data_path, rebuilding whatever is stale or missing."""
+    return read_summary(data_path) or materialize_summary(data_path)
+
+
+def summary_analytics(data_path, bins=DEFAULT_BINS, scatter_points=DEFAULT_SCATTER_POINTS):
+    """Analytics with other histogram bins or scatter size, recomputed from the stored partials."""
+    return analytics_from_partial(merge_summary(load_summary(data_path)['units']), bins, scatter_points)
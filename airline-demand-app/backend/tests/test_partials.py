@@ -0,0 +1,39 @@
+import os
+import sys
+
+import numpy as np
+import pandas as pd
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), '..'))
+from processor import PARTIAL_SCATTER_POINTS, flight_partial, merge_partials  # noqa: E402
+
+
+def _flights(airline, n, seed):
+    rng = np.random.default_rng(seed)
+    return pd.DataFrame({
+        'Date': '2025-07-01',
+        'Departure Time': [f"{h % 12 + 1}:{m:02d} AM" for h, m in zip(rng.integers(0, 12, n), rng.integers(0, 60, n))],
+        'Airline Company': airline,
+        'Stops': 'Nonstop',
+        'DurationMin': rng.integers(60, 300, n).astype(float),
+        'Price': rng.integers(2000, 15000, n).astype(float),
+        'CO2': rng.integers(50, 200, n).astype(float),
+    })
+
+
+def test_merged_scatter_keeps_equal_partials_equally():
+    # One airline per partial, so each scatter point says which partial it came from
+    partials = [flight_partial(_flights(f"A{i}", 5000, seed=i)) for i in range(6)]
+    for order in (partials, partials[::-1]):
+        scatter = merge_partials(order)['scatter']
+        assert len(scatter) == PARTIAL_SCATTER_POINTS
+        shares = pd.Series([r['Airline Company'] for r in scatter]).value_counts() / len(scatter)
+        assert len(shares) == 6
+        assert shares.between(1 / 6 - 0.04, 1 / 6 + 0.04).all(), shares.to_dict()
+
+
+def test_merged_scatter_does_not_depend_on_merge_order():
+    partials = [flight_partial(_flights(f"A{i}", 3000, seed=i)) for i in range(4)]
+    keys = lambda p: sorted(r['_key'] for r in p['scatter'])  # noqa: E731
+    assert keys(merge_partials(partials)) == keys(merge_partials(partials[::-1]))
+    assert keys(merge_partials(partials)) == keys(merge_partials([merge_partials(partials[:2]), merge_partials(partials[2:])]))
@@ -41,9 +41,11 @@ async function fetchAnalytics() {
     renderCO2BarChart(data.co2_by_airline);
     renderTable('cheapest-table', data.top_cheapest);
     renderTable('sample-table', data.sample_data);
-    renderDemandTrendChart(data.price_hist);
+    fetchTrends();
     renderStopsPieChart(data.stops_count);
-    renderAllFlightsTable('all-flights-table', data.all_flights, data.top_cheapest);
+    flightsState.offset = 0;
+    flightsState.topRows = data.top_cheapest || [];
+    fetchFlightsPage();
     // Optionally, fetch AI insight automatically after scraping/analytics
     // fetchAIInsight();
   } catch (e) {
@@ -132,28 +134,21 @@ function renderAirlineBarChart(top_airlines) {
   });
 }
 
+function histogramLabels(hist) {
+  return hist.counts.map((_, i) => `₹${Math.round(hist.edges[i])}-₹${Math.round(hist.edges[i + 1])}`);
+}
+
 function renderPriceHistChart(price_hist) {
   const ctx = document.getElementById('priceHistChart').getContext('2d');
   if(window.priceHistChartObj) window.priceHistChartObj.destroy();
-  // Simple histogram: bin prices
-  const bins = 10;
-  const min = Math.min(...price_hist);
-  const max = Math.max(...price_hist);
-  const binSize = (max-min)/bins;
-  const hist = Array(bins).fill(0);
-  price_hist.forEach(p => {
-    let idx = Math.floor((p-min)/binSize);
-    if(idx >= bins) idx = bins-1;
-    hist[idx]++;
-  });
-  const labels = Array(bins).fill(0).map((_,i)=>`₹${Math.round(min+i*binSize)}-₹${Math.round(min+(i+1)*binSize)}`);
+  // Bins come pre-computed from the backend: edges has one more entry than counts
   window.priceHistChartObj = new Chart(ctx, {
     type: 'bar',
     data: {
-      labels,
+      labels: histogramLabels(price_hist),
       datasets: [{
         label: 'Flights',
-        data: hist,
+        data: price_hist.counts,
         backgroundColor: 'rgba(16,185,129,0.7)'
       }]
     },
@@ -178,21 +173,38 @@ function renderCO2BarChart(co2_by_airline) {
   });
 }
 
-function renderDemandTrendChart(price_hist) {
+async function fetchTrends() {
+  try {
+    const response = await fetch('http://127.0.0.1:8000/api/trends');
+    const trends = await response.json();
+    renderDemandTrendChart(trends.by_departure_date || []);
+  } catch (e) {
+    renderDemandTrendChart([]);
+  }
+}
+
+function renderDemandTrendChart(byDate) {
   const ctx = document.getElementById('demandTrendChart').getContext('2d');
   if(window.demandTrendChartObj) window.demandTrendChartObj.destroy();
-  // Use price_hist as a proxy for demand trend (or replace with real demand data if available)
+  // Latest scraped price per departure date, from /api/trends
   window.demandTrendChartObj = new Chart(ctx, {
     type: 'line',
     data: {
-      labels: price_hist.map((_, i) => `Flight ${i+1}`),
+      labels: byDate.map(d => d.Date),
       datasets: [{
-        label: 'Price Trend (₹)',
-        data: price_hist,
+        label: 'Median Price (₹)',
+        data: byDate.map(d => d.median),
         borderColor: '#6366f1',
         backgroundColor: 'rgba(99,102,241,0.1)',
         fill: true,
         tension: 0.3
+      }, {
+        label: 'Lowest Price (₹)',
+        data: byDate.map(d => d.min),
+        borderColor: '#10b981',
+        backgroundColor: 'rgba(16,185,129,0.1)',
+        fill: false,
+        tension: 0.3
       }]
     },
     options: {responsive: true, plugins: {legend: {display: true}}}
@@ -232,6 +244,38 @@ function renderTable(tableId, rows) {
   table.innerHTML = thead + tbody;
 }
 
+const FLIGHTS_PAGE_SIZE = 50;
+const flightsState = {offset: 0, topRows: []};
+
+async function fetchFlightsPage() {
+  const params = new URLSearchParams({
+    sort: document.getElementById('flights-sort').value,
+    order: document.getElementById('flights-order').value,
+    offset: flightsState.offset,
+    limit: FLIGHTS_PAGE_SIZE
+  });
+  const airline = document.getElementById('flights-airline').value.trim();
+  const maxPrice = document.getElementById('flights-max-price').value;
+  if (airline) params.set('airline', airline);
+  if (maxPrice) params.set('max_price', maxPrice);
+  try {
+    const response = await fetch(`http://127.0.0.1:8000/api/flights?${params}`);
+    const page = await response.json();
+    renderAllFlightsTable('all-flights-table', page.flights, flightsState.topRows);
+    const first = page.total ? page.offset + 1 : 0;
+    const last = page.offset + (page.flights || []).length;
+    document.getElementById('flights-page-info').textContent = `Showing ${first}-${last} of ${page.total || 0} flights`;
+    document.getElementById('flights-prev').disabled = page.offset === 0;
+    document.getElementById('flights-next').disabled = page.next_offset == null;
+  } catch (e) {
+    document.getElementById('all-flights-table').innerHTML = '<tr><td class="text-red-400">Failed to load flights</td></tr>';
+  }
+}
+
+function flightKey(row) {
+  return [row['Airline Company'], row['Departure Time'], row['Date'], row.Price].join('|');
+}
+
 function renderAllFlightsTable(tableId, allRows, topRows) {
   const table = document.getElementById(tableId);
   if(!allRows || !allRows.length) {
@@ -239,19 +283,172 @@ function renderAllFlightsTable(tableId, allRows, topRows) {
     return;
   }
   const thead = '<thead><tr>' + Object.keys(allRows[0]).map(k => `<th class='border px-3 py-2 bg-blue-100 text-blue-900 font-semibold text-sm uppercase tracking-wider'>${k.replace(/_/g, ' ')}</th>`).join('') + '</tr></thead>';
-  const topSet = new Set(topRows.map(row => JSON.stringify(row)));
+  const topSet = new Set(topRows.map(flightKey));
   const tbody = '<tbody>' + allRows.map((row, i) => {
-    const isTop = topSet.has(JSON.stringify(row));
+    const isTop = topSet.has(flightKey(row));
     return `<tr class='${isTop ? 'bg-yellow-100 font-bold ring-2 ring-yellow-400' : (i % 2 === 0 ? 'bg-white' : 'bg-blue-50')}'>` +
       Object.values(row).map(v => `<td class='border px-3 py-2'>${v}</td>`).join('') + '</tr>';
   }).join('') + '</tbody>';
   table.innerHTML = thead + tbody;
 }
 
+document.getElementById('flights-prev').onclick = () => {
+  flightsState.offset = Math.max(0, flightsState.offset - FLIGHTS_PAGE_SIZE);
+  fetchFlightsPage();
+};
+document.getElementById('flights-next').onclick = () => {
+  flightsState.offset += FLIGHTS_PAGE_SIZE;
+  fetchFlightsPage();
+};
+['flights-sort', 'flights-order', 'flights-airline', 'flights-max-price'].forEach(id => {
+  document.getElementById(id).onchange = () => {
+    flightsState.offset = 0;
+    fetchFlightsPage();
+  };
+});
+
+// Poll a background scrape job until it finishes, showing per-date progress
+async function pollScrapeJob(jobId, statusDiv) {
+  while (true) {
+    const response = await fetch(`http://127.0.0.1:8000/api/scrape/${jobId}`);
+    const job = await response.json();
+    if (job.status === 'succeeded') return job;
+    if (job.status === 'failed' || job.error) throw new Error(job.error || 'Scraping failed');
+    const totalDays = Math.round((new Date(job.end_date) - new Date(job.start_date)) / 86400000) + 1;
+    statusDiv.innerHTML = `
+      <div class="inline-flex items-center px-4 py-2 rounded-lg bg-blue-50 text-blue-700 text-sm font-medium">
+        <i class="fas fa-spinner fa-spin mr-2"></i>
+        <span>Scraping ${job.origin} to ${job.destination}: ${job.dates_completed}/${totalDays} days, ${job.total_rows} flights (${job.status})</span>
+      </div>
+    `;
+    await new Promise(resolve => setTimeout(resolve, 2000));
+  }
+}
+
+// Live results while a scrape runs: merge each day's aggregate delta from the event stream
+function emptyLiveState() {
+  return {rows: 0, days: {}, airlines: {}, stops: {}, cheapest: [], sample: []};
+}
+
+function mergeLiveDelta(state, delta, rows) {
+  state.rows += delta.rows;
+  for (const [day, count] of Object.entries(delta.days)) state.days[day] = (state.days[day] || 0) + count;
+  for (const [stop, count] of Object.entries(delta.stops)) state.stops[stop] = (state.stops[stop] || 0) + count;
+  for (const [airline, stats] of Object.entries(delta.airlines)) {
+    const total = state.airlines[airline] || (state.airlines[airline] = {});
+    for (const key of ['count', 'price_count', 'price_sum', 'co2_count', 'co2_sum']) {
+      total[key] = (total[key] || 0) + (stats[key] || 0);
+    }
+  }
+  state.cheapest = state.cheapest.concat(delta.cheapest).sort((a, b) => a.Price - b.Price).slice(0, 5);
+  if (state.sample.length < 5) state.sample = state.sample.concat(rows.slice(0, 5 - state.sample.length));
+}
+
+function liveAnalytics(state) {
+  const airlines = Object.entries(state.airlines);
+  return {
+    total_flights: state.rows,
+    top_cheapest: state.cheapest,
+    busiest_day: Object.keys(state.days).sort((a, b) => state.days[b] - state.days[a])[0],
+    stops_count: state.stops,
+    top_airlines: airlines.filter(([, s]) => s.price_count)
+      .map(([a, s]) => ({'Airline Company': a, Price: s.price_sum / s.price_count}))
+      .sort((a, b) => a.Price - b.Price),
+    co2_by_airline: airlines.filter(([, s]) => s.co2_count)
+      .map(([a, s]) => ({'Airline Company': a, CO2: s.co2_sum / s.co2_count})),
+    sample_data: state.sample
+  };
+}
+
+function renderLiveAnalytics(state) {
+  const data = liveAnalytics(state);
+  renderSummaryCards(data);
+  renderAirlineBarChart(data.top_airlines);
+  renderCO2BarChart(data.co2_by_airline);
+  renderStopsPieChart(data.stops_count);
+  renderTable('cheapest-table', data.top_cheapest);
+  renderTable('sample-table', data.sample_data);
+}
+
+function renderScrapeProgress(statusDiv, job, daysDone, rows) {
+  const totalDays = Math.round((new Date(job.end_date) - new Date(job.start_date)) / 86400000) + 1;
+  statusDiv.innerHTML = `
+    <div class="inline-flex items-center px-4 py-2 rounded-lg bg-blue-50 text-blue-700 text-sm font-medium">
+      <i class="fas fa-spinner fa-spin mr-2"></i>
+      <span>Scraping ${job.origin} to ${job.destination}: ${daysDone}/${totalDays} days, ${rows} flights</span>
+    </div>
+  `;
+}
+
+// Follow a scrape over Server-Sent Events, updating the dashboard as each day lands.
+// Resolves with the final job like pollScrapeJob; falls back to polling without EventSource.
+function streamScrapeJob(job, statusDiv) {
+  if (!window.EventSource) return pollScrapeJob(job.job_id, statusDiv);
+  return new Promise((resolve, reject) => {
+    const state = emptyLiveState();
+    let daysDone = 0;
+    const source = new EventSource(`http://127.0.0.1:8000/api/scrape/${job.job_id}/events`);
+    source.addEventListener('progress', e => {
+      const event = JSON.parse(e.data);
+      if (event.status === 'failed') daysDone += 1;
+      renderScrapeProgress(statusDiv, job, daysDone, state.rows);
+    });
+    source.addEventListener('rows', e => {
+      const event = JSON.parse(e.data);
+      daysDone += 1;
+      if (event.delta) {
+        mergeLiveDelta(state, event.delta, event.rows);
+        renderLiveAnalytics(state);
+      }
+      renderScrapeProgress(statusDiv, job, daysDone, state.rows);
+    });
+    source.addEventListener('done', e => {
+      source.close();
+      const result = JSON.parse(e.data);
+      if (result.status === 'succeeded') resolve(result);
+      else reject(new Error(result.error || 'Scraping failed'));
+    });
+    // EventSource reconnects on its own (resuming after the last event id); only give up if it closes
+    source.onerror = () => {
+      if (source.readyState === EventSource.CLOSED) reject(new Error('Lost connection to the scrape stream'));
+    };
+  });
+}
+
+// Suggest airports from /api/airports as the user types a code, city or airport name
+function attachAirportAutocomplete(inputId, listId) {
+  const input = document.getElementById(inputId);
+  const list = document.getElementById(listId);
+  let timer = null;
+  let controller = null;
+  input.addEventListener('input', () => {
+    clearTimeout(timer);
+    const q = input.value.trim();
+    if (!q) return;
+    timer = setTimeout(async () => {
+      if (controller) controller.abort();
+      controller = new AbortController();
+      try {
+        const response = await fetch(`http://127.0.0.1:8000/api/airports?q=${encodeURIComponent(q)}&limit=8`,
+                                     {signal: controller.signal});
+        if (!response.ok) return;
+        const {airports} = await response.json();
+        list.innerHTML = airports.map(a =>
+          `<option value="${a.code}">${a.code} - ${a.city || a.name}${a.city && a.name ? ` (${a.name})` : ''}</option>`
+        ).join('');
+      } catch (e) {
+        // Aborted by a newer keystroke, or the backend is down; keep the current suggestions
+      }
+    }, 150);
+  });
+}
+attachAirportAutocomplete('origin-input', 'origin-options');
+attachAirportAutocomplete('destination-input', 'destination-options');
+
 // Add scraping logic
 document.getElementById('scrape-btn').onclick = async function() {
-  const origin = document.getElementById('origin-input').value;
-  const destination = document.getElementById('destination-input').value;
+  const origin = document.getElementById('origin-input').value.trim().toUpperCase();
+  const destination = document.getElementById('destination-input').value.trim().toUpperCase();
   const startDate = document.getElementById('start-date-input').value;
   const rangeDays = parseInt(document.getElementById('date-range-input').value, 10);
   // Calculate end date based on range
@@ -282,15 +479,21 @@ document.getElementById('scrape-btn').onclick = async function() {
         origin, destination, start_date: startDate, end_date: endDate, filename: 'flight_data.csv'
       })
     });
-    if (!response.ok) throw new Error('Scraping failed');
-    const result = await response.json();
+    if (!response.ok) {
+      // 422: the backend rejected the airports or dates before queuing anything
+      const body = await response.json().catch(() => ({}));
+      const detail = Array.isArray(body.detail) ? body.detail.map(d => d.msg.replace(/^Value error, /, '')).join('; ') : '';
+      throw new Error(detail || 'Scraping failed');
+    }
+    const job = await response.json();
+    const result = await streamScrapeJob(job, statusDiv);
     statusDiv.innerHTML = `
       <div class="inline-flex items-center px-4 py-2 rounded-lg bg-green-50 text-green-700 text-sm font-medium">
         <i class="fas fa-check-circle mr-2"></i>
-        <span>${result.status || 'Analysis complete!'}</span>
+        <span>Analysis complete! ${result.total_rows} flights across ${result.dates_completed} day(s)</span>
       </div>
     `;
-    // Refresh dashboard after scraping
+    // Replace the live view with the full analytics (histograms, trends, flights table)
     fetchAnalytics();
   } catch (e) {
     statusDiv.innerHTML = `
@@ -0,0 +1,51 @@
+# Autocomplete latency of the airport index against a linear scan of the same table.
+# Uses --csv when given (e.g. an OurAirports/datahub airport-codes.csv), otherwise synthetic airports.
+# Usage: python benchmarks/bench_airports.py [--csv data/airport-codes.csv] [--airports 9000]
+
+import argparse
+import os
+import random
+import string
+import sys
+import timeit
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), '..', 'airline-demand-app', 'backend'))
+from airports import AirportIndex, _words  # noqa: E402
+
+QUERIES = ["a", "de", "new", "new y", "san fr", "BOM", "int", "zzzz"]
+
+
+def synthetic_airports(n: int, seed: int = 0):
+    rng = random.Random(seed)
+    words = ["".join(rng.choices(string.ascii_lowercase, k=rng.randint(4, 9))) for _ in range(n // 2)]
+    airports = {}
+    while len(airports) < n:
+        code = "".join(rng.choices(string.ascii_uppercase, k=3))
+        name = " ".join(rng.choices(words, k=2)).title() + rng.choice([" International", " Regional", ""]) + " Airport"
+        airports[code] = {"code": code, "name": name, "city": rng.choice(words).title(), "country": "XX",
+                          "type": rng.choice(["large_airport", "medium_airport", "small_airport"])}
+    return list(airports.values())
+
+
+def linear_search(airports, query, limit=10):
+    """What a naive endpoint would do: test every airport on every keystroke."""
+    code, words = query.strip().upper(), _words(query)
+    hits = [a for a in airports if a["code"].startswith(code)
+            or all(any(w.startswith(q) for w in _words(a["city"] + " " + a["name"])) for q in words)]
+    return hits[:limit]
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Benchmark airport autocomplete lookups.")
+    parser.add_argument("--csv", type=str, default=None)
+    parser.add_argument("--airports", type=int, default=9000, help="Synthetic table size when --csv isn't given")
+    parser.add_argument("--number", type=int, default=1000)
+    args = parser.parse_args()
+    t0 = timeit.default_timer()
+    index = AirportIndex.load(args.csv) if args.csv else AirportIndex(synthetic_airports(args.airports))
+    print(f"{len(index):,} airports indexed in {(timeit.default_timer() - t0) * 1000:.0f} ms")
+    for query in QUERIES:
+        indexed = timeit.timeit(lambda: index.search(query), number=args.number) / args.number
+        scan = timeit.timeit(lambda: linear_search(index.airports, query), number=10) / 10
+        print(f"{query!r:10} {len(index.search(query)):3d} hits  index {indexed * 1e6:8.1f} us  "
+              f"scan {scan * 1e6:10.1f} us")
@@ -0,0 +1,52 @@
+# Compare per-page extraction latency of the batch and per-card modes against saved HTML fixtures.
+# Usage: python benchmarks/bench_extraction.py [--iterations 20] [fixtures/*.html ...]
+
+import argparse
+import asyncio
+import glob
+import os
+import statistics
+import sys
+import time
+
+from playwright.async_api import async_playwright
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), '..', 'scraper'))
+from flight_scraper import EXTRACTORS  # noqa: E402
+
+FIXTURES_DIR = os.path.join(os.path.dirname(__file__), 'fixtures')
+
+
+async def bench_fixture(page, path: str, iterations: int) -> None:
+    with open(path, encoding='utf-8') as f:
+        await page.set_content(f.read())
+    results = {}
+    for mode, extract in EXTRACTORS.items():
+        await extract(page)  # warm-up
+        timings = []
+        for _ in range(iterations):
+            t0 = time.perf_counter()
+            rows = await extract(page)
+            timings.append((time.perf_counter() - t0) * 1000)
+        results[mode] = rows
+        print(f"{os.path.basename(path)} [{mode:8}] cards={len(rows):3d} "
+              f"median={statistics.median(timings):8.2f} ms  min={min(timings):8.2f} ms")
+    if results["batch"] != results["per-card"]:
+        print("  WARNING: modes returned different rows")
+
+
+async def main(paths, iterations: int) -> None:
+    async with async_playwright() as p:
+        browser = await p.chromium.launch(headless=True)
+        page = await browser.new_page()
+        for path in paths:
+            await bench_fixture(page, path, iterations)
+        await browser.close()
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Benchmark flight card extraction modes.")
+    parser.add_argument("fixtures", nargs="*", help="HTML fixtures (default: benchmarks/fixtures/*.html)")
+    parser.add_argument("--iterations", type=int, default=20)
+    args = parser.parse_args()
+    asyncio.run(main(args.fixtures or sorted(glob.glob(os.path.join(FIXTURES_DIR, '*.html'))), args.iterations))
@@ -0,0 +1,75 @@
+# Peak RSS of full-file vs chunked analytics on synthetic scraper CSVs.
+# Each measurement runs in a fresh interpreter so peaks don't carry over between modes.
+# Usage: python benchmarks/bench_memory.py [--sizes 1000000 2000000] [--chunksize 200000]
+
+import argparse
+import json
+import os
+import resource
+import subprocess
+import sys
+import tempfile
+import time
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), '..', 'airline-demand-app', 'backend'))
+
+MODES = ("full", "chunked")
+
+
+def peak_rss_kib() -> int:
+    """High-water RSS of this process. Linux keeps ru_maxrss across fork+exec, so the parent's peak
+    would leak into every child; VmHWM belongs to the exec'd image and starts fresh."""
+    try:
+        with open("/proc/self/status") as f:
+            for line in f:
+                if line.startswith("VmHWM:"):
+                    return int(line.split()[1])
+    except OSError:
+        pass
+    return resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+
+
+def measure(mode: str, csv_path: str, chunksize: int) -> dict:
+    """Run one mode in this process and report peak RSS above the post-import baseline."""
+    from processor import process_flight_csv
+
+    baseline = peak_rss_kib()
+    t0 = time.perf_counter()
+    process_flight_csv(csv_path, chunksize=chunksize if mode == "chunked" else None)
+    seconds = time.perf_counter() - t0
+    peak = peak_rss_kib()
+    return {"seconds": seconds, "peak_mb": peak / 1024, "delta_mb": (peak - baseline) / 1024}
+
+
+def run_child(mode: str, csv_path: str, chunksize: int) -> dict:
+    out = subprocess.run([sys.executable, __file__, "--child", mode, csv_path, "--chunksize", str(chunksize)],
+                         check=True, capture_output=True, text=True).stdout
+    return json.loads(out.strip().splitlines()[-1])
+
+
+def bench(n: int, workdir: str, chunksize: int) -> None:
+    sys.path.insert(0, os.path.dirname(__file__))
+    from synthetic import generate_flights
+
+    csv_path = os.path.join(workdir, f"flights_{n}.csv")
+    generate_flights(n).sort_values("Date", kind="stable").to_csv(csv_path, index=False)
+    size_mb = os.path.getsize(csv_path) / 2**20
+    for mode in MODES:
+        r = run_child(mode, csv_path, chunksize)
+        print(f"{n:>9,} rows ({size_mb:6.0f} MB csv)  {mode:8} {r['seconds']:7.2f} s  "
+              f"peak {r['peak_mb']:7.0f} MB  +{r['delta_mb']:6.0f} MB  "
+              f"({r['delta_mb'] / (n / 1e6):6.0f} MB per million rows)")
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Benchmark peak memory of full vs chunked analytics.")
+    parser.add_argument("--sizes", type=int, nargs="+", default=[1_000_000, 2_000_000])
+    parser.add_argument("--chunksize", type=int, default=200_000)
+    parser.add_argument("--child", nargs=2, metavar=("MODE", "CSV"), help=argparse.SUPPRESS)
+    args = parser.parse_args()
+    if args.child:
+        print(json.dumps(measure(args.child[0], args.child[1], args.chunksize)))
+        sys.exit(0)
+    with tempfile.TemporaryDirectory() as workdir:
+        for size in args.sizes:
+            bench(size, workdir, args.chunksize)
@@ -0,0 +1,66 @@
+# Check the vectorized column parsers against the scalar ones and report rows/sec for both.
+# Usage: python benchmarks/bench_parsers.py [--sizes 10000 100000 1000000]
+
+import argparse
+import os
+import sys
+import time
+
+import numpy as np
+import pandas as pd
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), '..', 'airline-demand-app', 'backend'))
+from processor import (  # noqa: E402
+    parse_co2, parse_co2_series, parse_duration, parse_duration_series, parse_price, parse_price_series,
+)
+
+# Cell values seen in scraper output, including the junk the parsers must reject
+PRICE_SAMPLES = ["₹4,512", "$1,234", "₹12,093", "N/A", ".", "", "Price unavailable", "1.2.3", np.nan, None, 5400.0]
+CO2_SAMPLES = ["98 kg CO2e", "142 kg CO2e", "N/A", ".", "", "Emissions unknown", np.nan, None, 77]
+DURATION_SAMPLES = ["1 hr 25 min", "2 hr", "55 min", "13 hr 5 min", "N/A", "", "   ", "1 hr  5 min",
+                    "about 2 hr", np.nan, None, 90]
+
+PARSERS = [
+    ("price", PRICE_SAMPLES, parse_price, parse_price_series),
+    ("co2", CO2_SAMPLES, parse_co2, parse_co2_series),
+    ("duration", DURATION_SAMPLES, parse_duration, parse_duration_series),
+]
+
+
+def make_column(samples, n: int, seed: int = 0) -> pd.Series:
+    rng = np.random.default_rng(seed)
+    return pd.Series(np.array(samples, dtype=object)[rng.integers(0, len(samples), n)], dtype=object)
+
+
+def check_parity() -> None:
+    for name, samples, scalar, vectorized in PARSERS:
+        column = make_column(samples, 5000)
+        expected = column.apply(scalar).astype(float)
+        actual = vectorized(column)
+        pd.testing.assert_series_equal(actual, expected, check_names=False)
+        # A CSV-loaded column goes through read_csv's own dtype inference
+        as_read = pd.Series(samples[:-1] * 10)
+        pd.testing.assert_series_equal(vectorized(as_read), as_read.apply(scalar).astype(float), check_names=False)
+    print("parity: vectorized parsers match scalar parsers")
+
+
+def bench(sizes) -> None:
+    for n in sizes:
+        for name, samples, scalar, vectorized in PARSERS:
+            column = make_column(samples, n)
+            t0 = time.perf_counter()
+            column.apply(scalar)
+            t_scalar = time.perf_counter() - t0
+            t0 = time.perf_counter()
+            vectorized(column)
+            t_vec = time.perf_counter() - t0
+            print(f"{n:>9,} rows  {name:8}  apply {n / t_scalar:>12,.0f} rows/s  "
+                  f"vectorized {n / t_vec:>12,.0f} rows/s  ({t_scalar / t_vec:.1f}x)")
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Benchmark scalar vs vectorized column parsers.")
+    parser.add_argument("--sizes", type=int, nargs="+", default=[10_000, 100_000, 1_000_000])
+    args = parser.parse_args()
+    check_parity()
+    bench(args.sizes)
@@ -0,0 +1,78 @@
+# Prompt size and request latency for AI insights: the old first-200-raw-rows prompt sent with a new
+# connection per call, against the budgeted summary prompt sent over the pooled session.
+# Runs against gemini_stub.py in-process; no API key or network needed.
+# Usage: python benchmarks/bench_prompt.py [--rows 200000] [--calls 20] [--budget 1500]
+
+import argparse
+import os
+import sys
+import tempfile
+import threading
+import time
+from http.server import ThreadingHTTPServer
+
+import pandas as pd
+import requests
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), '..', 'airline-demand-app', 'backend'))
+import ai_insights  # noqa: E402
+from gemini_stub import GeminiStubHandler  # noqa: E402
+from synthetic import generate_flights  # noqa: E402
+
+LEGACY_HEADER = (
+    "You are an expert airline data analyst. Analyze the following airline flight CSV data and provide:\n"
+    "1. Three insightful bullet points (in markdown, with bolded keywords) about demand trends, pricing changes, and popular routes.\n"
+    "2. A markdown table summarizing the top 3 airlines by average price (columns: Airline, Avg Price).\n"
+    "Respond in markdown format only.\n\n"
+)
+
+
+def legacy_prompt(csv_path, max_rows=200):
+    return LEGACY_HEADER + pd.read_csv(csv_path, nrows=max_rows).to_csv(index=False)
+
+
+def legacy_request(url, prompt):
+    # requests.post opens (and closes) a fresh connection every call
+    resp = requests.post(url, headers={"X-goog-api-key": "bench"}, json={"contents": [{"parts": [{"text": prompt}]}]},
+                         timeout=60)
+    resp.raise_for_status()
+
+
+def timed_calls(fn, calls):
+    samples = []
+    for _ in range(calls):
+        t0 = time.perf_counter()
+        fn()
+        samples.append(time.perf_counter() - t0)
+    samples.sort()
+    return samples[len(samples) // 2], samples[int(len(samples) * 0.95) - 1]
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Benchmark AI prompt size and request latency against the stub.")
+    parser.add_argument("--rows", type=int, default=200_000)
+    parser.add_argument("--calls", type=int, default=20)
+    parser.add_argument("--budget", type=int, default=ai_insights.AI_PROMPT_TOKENS, help="Prompt token budget")
+    args = parser.parse_args()
+
+    server = ThreadingHTTPServer(("127.0.0.1", 0), GeminiStubHandler)
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    url = f"http://127.0.0.1:{server.server_address[1]}/"
+    ai_insights.GEMINI_API_URL = url
+    os.environ["GEMINI_API_KEY"] = "bench"
+
+    with tempfile.TemporaryDirectory() as workdir:
+        csv_path = os.path.join(workdir, "flight_data.csv")
+        generate_flights(args.rows).sort_values("Date", kind="stable").to_csv(csv_path, index=False)
+        old = legacy_prompt(csv_path)
+        t0 = time.perf_counter()
+        new = ai_insights.build_prompt(csv_path, args.budget)
+        build_ms = (time.perf_counter() - t0) * 1000
+        print(f"legacy prompt: {len(old):7,} chars ~{ai_insights.estimate_tokens(old):6,} tokens  (first 200 rows only)")
+        print(f"budget prompt: {len(new):7,} chars ~{ai_insights.estimate_tokens(new):6,} tokens  "
+              f"(all {args.rows:,} rows; first build {build_ms:.0f} ms incl. summary)")
+        for label, fn in (("legacy: new connection", lambda: legacy_request(url, old)),
+                          ("budget: pooled session", lambda: ai_insights.request_gemini(new))):
+            p50, p95 = timed_calls(fn, args.calls)
+            print(f"{label:24} p50 {p50 * 1000:6.2f} ms  p95 {p95 * 1000:6.2f} ms")
+    server.shutdown()
@@ -0,0 +1,53 @@
+# Latency of /api/query shapes on the SQLite engine against the same aggregate done in pandas from the CSV.
+# Usage: python benchmarks/bench_query.py [--rows 1000000] [--number 20]
+
+import argparse
+import os
+import sys
+import tempfile
+import timeit
+
+BENCH_DIR = os.path.dirname(os.path.abspath(__file__))
+sys.path.insert(0, os.path.join(BENCH_DIR, '..', 'airline-demand-app', 'backend'))
+sys.path.insert(0, BENCH_DIR)
+import query_engine  # noqa: E402
+from processor import load_flight_frame  # noqa: E402
+from synthetic import generate_flights  # noqa: E402
+
+QUERIES = {
+    "count by airline": dict(group_by=["airline"], metrics=["count", "avg_price"]),
+    "p50/p90 by airline": dict(group_by=["airline"], metrics=["p50_price", "p90_price"]),
+    "p50 by date, top 5": dict(group_by=["date"], metrics=["p50_price"], order_by="p50_price", descending=True, limit=5),
+    "p99 overall": dict(metrics=["count", "p99_price"]),
+    "p50/p90/p99 by weekday": dict(group_by=["weekday"], metrics=["p50_price", "p90_price", "p99_price"]),
+    "p50/p90/p99 by hour": dict(group_by=["departure_hour"], metrics=["p50_price", "p90_price", "p99_price"]),
+    "filtered route/stops": dict(group_by=["route", "stops"], metrics=["count", "min_price"],
+                                 filters={"airline": ["IndiGo", "Vistara"], "max_price": 6000}),
+}
+
+
+def pandas_baseline(csv_path):
+    """What answering "median price by airline" costs without the database: parse the CSV again."""
+    return load_flight_frame(csv_path).groupby("Airline Company", observed=True)["Price"].median()
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Benchmark the /api/query engine.")
+    parser.add_argument("--rows", type=int, default=1_000_000)
+    parser.add_argument("--number", type=int, default=20)
+    args = parser.parse_args()
+    with tempfile.TemporaryDirectory() as workdir:
+        csv_path = os.path.join(workdir, "flight_data.csv")
+        generate_flights(args.rows).to_csv(csv_path, index=False)
+        t0 = timeit.default_timer()
+        query_engine.ingest(csv_path)
+        print(f"{args.rows:,} rows ingested in {timeit.default_timer() - t0:.1f} s")
+        t0 = timeit.default_timer()
+        query_engine.ingest(csv_path)
+        print(f"unchanged data checked in {(timeit.default_timer() - t0) * 1000:.2f} ms")
+        for label, shape in QUERIES.items():
+            query_engine.query(csv_path, **shape)  # prepares and caches the statements
+            seconds = timeit.timeit(lambda: query_engine.query(csv_path, **shape), number=args.number) / args.number
+            print(f"{label:24} {seconds * 1000:8.1f} ms")
+        seconds = timeit.timeit(lambda: pandas_baseline(csv_path), number=3) / 3
+        print(f"{'pandas re-read':24} {seconds * 1000:8.1f} ms")
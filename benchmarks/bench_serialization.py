@@ -0,0 +1,72 @@
+# Serialization time and bytes on the wire for /api/analyze?include_all_flights=true payloads:
+# the old safe_for_json + jsonable_encoder + json.dumps path against responses.dumps (orjson).
+# Usage: python benchmarks/bench_serialization.py [--sizes 10000 100000]
+
+import argparse
+import gzip
+import json
+import math
+import os
+import sys
+import tempfile
+import time
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), '..', 'airline-demand-app', 'backend'))
+from fastapi.encoders import jsonable_encoder  # noqa: E402
+from processor import process_flight_csv  # noqa: E402
+from responses import dumps  # noqa: E402
+from synthetic import generate_flights  # noqa: E402
+
+try:
+    import brotli
+except ImportError:
+    brotli = None
+
+
+def safe_for_json(obj):
+    """The recursive cleanup main.py used to run over every response."""
+    if isinstance(obj, float):
+        if math.isinf(obj) or math.isnan(obj):
+            return None
+        return obj
+    if isinstance(obj, dict):
+        return {k: safe_for_json(v) for k, v in obj.items()}
+    if isinstance(obj, list):
+        return [safe_for_json(v) for v in obj]
+    return obj
+
+
+def legacy_render(result):
+    # What returning a dict did: our walk, FastAPI's encoder, then starlette's JSONResponse.render
+    content = jsonable_encoder(safe_for_json(result))
+    return json.dumps(content, ensure_ascii=False, allow_nan=False, separators=(",", ":")).encode("utf-8")
+
+
+def timed(fn, *args, repeat=3):
+    best, out = float("inf"), None
+    for _ in range(repeat):
+        t0 = time.perf_counter()
+        out = fn(*args)
+        best = min(best, time.perf_counter() - t0)
+    return best, out
+
+
+def bench(n: int, workdir: str) -> None:
+    csv_path = os.path.join(workdir, f"flights_{n}.csv")
+    generate_flights(n).to_csv(csv_path, index=False)
+    result = process_flight_csv(csv_path, include_all_flights=True)
+    for label, render in (("safe_for_json+jsonable", legacy_render), ("orjson", dumps)):
+        seconds, body = timed(render, result)
+        sizes = f"raw {len(body) / 2**20:6.1f} MB  gzip {len(gzip.compress(body, 6)) / 2**20:5.1f} MB"
+        if brotli is not None:
+            sizes += f"  br {len(brotli.compress(body, quality=4)) / 2**20:5.1f} MB"
+        print(f"{n:>8,} rows  {label:23} {seconds * 1000:8.1f} ms  {sizes}")
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Benchmark analyze response serialization.")
+    parser.add_argument("--sizes", type=int, nargs="+", default=[10_000, 100_000])
+    args = parser.parse_args()
+    with tempfile.TemporaryDirectory() as workdir:
+        for size in args.sizes:
+            bench(size, workdir)
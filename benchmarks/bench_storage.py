@@ -0,0 +1,53 @@
+# Compare load time of the scraper CSV path against the Parquet store.
+# Usage: python benchmarks/bench_storage.py [--sizes 100000 1000000]
+
+import argparse
+import os
+import sys
+import tempfile
+import time
+from datetime import datetime
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), '..', 'airline-demand-app', 'backend'))
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), '..', 'scraper'))
+from flight_store import write_store  # noqa: E402
+from processor import load_flight_frame, load_flight_store, process_flight_csv, process_flight_store  # noqa: E402
+from synthetic import generate_flights  # noqa: E402
+
+ANALYTICS_COLUMNS = ["Airline Company", "Stops", "Date", "Price", "CO2", "DurationMin"]
+
+
+def timed(fn, *args, repeat=3, **kwargs):
+    best = float("inf")
+    for _ in range(repeat):
+        t0 = time.perf_counter()
+        fn(*args, **kwargs)
+        best = min(best, time.perf_counter() - t0)
+    return best
+
+
+def bench(n: int, workdir: str) -> None:
+    df = generate_flights(n)
+    csv_path = os.path.join(workdir, f"flights_{n}.csv")
+    store_dir = os.path.join(workdir, f"store_{n}")
+    df.to_csv(csv_path, index=False)
+    write_store(df.drop(columns=["Origin", "Destination"]).to_dict(orient="records"), store_dir, "DEL", "BOM",
+                scraped_at=datetime(2025, 7, 1))
+    rows = [
+        ("csv: read + parse", timed(load_flight_frame, csv_path)),
+        ("store: all columns", timed(load_flight_store, store_dir)),
+        ("store: analytics columns", timed(load_flight_store, store_dir, columns=ANALYTICS_COLUMNS)),
+        ("csv: process_flight_csv", timed(process_flight_csv, csv_path)),
+        ("store: process_flight_store", timed(process_flight_store, store_dir)),
+    ]
+    for label, seconds in rows:
+        print(f"{n:>9,} rows  {label:28} {seconds * 1000:9.1f} ms")
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Benchmark CSV vs Parquet store load time.")
+    parser.add_argument("--sizes", type=int, nargs="+", default=[100_000, 1_000_000])
+    args = parser.parse_args()
+    with tempfile.TemporaryDirectory() as workdir:
+        for size in args.sizes:
+            bench(size, workdir)
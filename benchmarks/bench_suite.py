@@ -0,0 +1,262 @@
+# End-to-end benchmark suite: every stage from raw scraper CSV to API payload, plus card extraction
+# against the saved result pages served from a local HTTP server (no network needed).
+# Each stage runs in a fresh interpreter so its peak RSS isn't inflated by earlier stages.
+# Usage: python benchmarks/bench_suite.py [--sizes 100000 1000000] [--repeat 5] [--stages parse serialize]
+#        [--json results.json] [--compare baseline.json]
+
+import argparse
+import functools
+import glob
+import http.server
+import json
+import os
+import platform
+import re
+import shutil
+import subprocess
+import sys
+import tempfile
+import threading
+import time
+from datetime import datetime
+
+import numpy as np
+
+BENCH_DIR = os.path.dirname(os.path.abspath(__file__))
+sys.path.insert(0, os.path.join(BENCH_DIR, '..', 'airline-demand-app', 'backend'))
+sys.path.insert(0, os.path.join(BENCH_DIR, '..', 'scraper'))
+sys.path.insert(0, BENCH_DIR)
+from bench_memory import peak_rss_kib  # noqa: E402
+
+FIXTURES_DIR = os.path.join(BENCH_DIR, 'fixtures')
+
+
+# Each stage: setup(csv_path, workdir, args) -> state (untimed), run(state) -> rows handled (timed)
+
+def _setup_path(csv_path, workdir, args):
+    return csv_path
+
+
+def _run_parse(csv_path):
+    from processor import process_flight_csv
+    return process_flight_csv(csv_path)['total_flights']
+
+
+def _run_parse_chunked(csv_path, chunksize=200_000):
+    from processor import process_flight_csv
+    return process_flight_csv(csv_path, chunksize=chunksize)['total_flights']
+
+
+def _setup_serialize(csv_path, workdir, args):
+    from processor import process_flight_csv
+    return process_flight_csv(csv_path, include_all_flights=True)
+
+
+def _run_serialize(result):
+    from responses import dumps
+    dumps(result)
+    return len(result['all_flights'])
+
+
+def _setup_summary(csv_path, workdir, args):
+    data_path = os.path.join(workdir, 'summary_flights.csv')
+    shutil.copyfile(csv_path, data_path)
+    return data_path
+
+
+def _run_summary(data_path):
+    from summary import materialize_summary, summary_path
+    # A cold build each time; an unchanged file would otherwise be served from the previous run
+    if os.path.exists(summary_path(data_path)):
+        os.remove(summary_path(data_path))
+    return materialize_summary(data_path)['analytics']['total_flights']
+
+
+def _setup_clean(csv_path, workdir, args):
+    data_path = os.path.join(workdir, 'clean_flights.csv')
+    shutil.copyfile(csv_path, data_path)
+    return data_path
+
+
+def _run_clean(data_path):
+    from flight_scraper import clean_csv
+    clean_csv(data_path)
+    return sum(1 for _ in open(data_path, encoding='utf-8')) - 1
+
+
+STAGES = {
+    "parse": (_setup_path, _run_parse),
+    "parse_chunked": (_setup_path, _run_parse_chunked),
+    "summary": (_setup_summary, _run_summary),
+    "serialize": (_setup_serialize, _run_serialize),
+    "clean_csv": (_setup_clean, _run_clean),
+}
+EXTRACT_STAGE = "extract"
+
+
+def latency_stats(seconds, rows):
+    ms = np.array(seconds) * 1000
+    p50, p90, p99 = np.percentile(ms, [50, 90, 99])
+    return {"runs": len(ms), "rows": rows, "mean_ms": float(ms.mean()), "p50_ms": float(p50), "p90_ms": float(p90),
+            "p99_ms": float(p99), "rows_per_s": rows / (p50 / 1000) if p50 else None}
+
+
+def measure_stage(stage, csv_path, args):
+    """Run one CSV stage in this process: untimed setup, one warm-up, then args.repeat timed runs."""
+    setup, run = STAGES[stage]
+    if stage == "parse_chunked":
+        run = functools.partial(run, chunksize=args.chunksize)
+    with tempfile.TemporaryDirectory() as workdir:
+        state = setup(csv_path, workdir, args)
+        baseline = peak_rss_kib()
+        rows = run(state)
+        timings = []
+        for _ in range(args.repeat):
+            t0 = time.perf_counter()
+            run(state)
+            timings.append(time.perf_counter() - t0)
+        peak = peak_rss_kib()
+    return [{"stage": stage, **latency_stats(timings, rows), "peak_mb": peak / 1024, "delta_mb": (peak - baseline) / 1024}]
+
+
+class _QuietHandler(http.server.SimpleHTTPRequestHandler):
+    def log_message(self, *args):
+        pass
+
+
+def serve_fixtures(directory=FIXTURES_DIR):
+    """Serve the saved result pages on an ephemeral localhost port; returns (server, base_url)."""
+    server = http.server.ThreadingHTTPServer(('127.0.0.1', 0), functools.partial(_QuietHandler, directory=directory))
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    return server, f"http://127.0.0.1:{server.server_address[1]}/"
+
+
+async def _measure_extract(args):
+    from playwright.async_api import async_playwright
+    from flight_scraper import EXTRACTORS
+
+    server, base_url = serve_fixtures()
+    fixtures = sorted(os.path.basename(p) for p in glob.glob(os.path.join(FIXTURES_DIR, '*.html')))
+    loads, timings, rows = [], {mode: [] for mode in EXTRACTORS}, {}
+    try:
+        async with async_playwright() as p:
+            browser = await p.chromium.launch(headless=True)
+            page = await browser.new_page()
+            baseline = peak_rss_kib()
+            for name in fixtures:
+                for i in range(args.repeat + 1):
+                    t0 = time.perf_counter()
+                    await page.goto(base_url + name, wait_until="load")
+                    load = time.perf_counter() - t0
+                    for mode, extract in EXTRACTORS.items():
+                        t0 = time.perf_counter()
+                        rows[mode] = await extract(page)
+                        if i:  # first pass is the warm-up
+                            timings[mode].append(time.perf_counter() - t0)
+                    if i:
+                        loads.append(load)
+            await browser.close()
+    finally:
+        server.shutdown()
+    # The browser is a separate process: peak RSS here only covers the Python side
+    peak = peak_rss_kib()
+    memory = {"peak_mb": peak / 1024, "delta_mb": (peak - baseline) / 1024}
+    cards = len(rows.get("batch", []))
+    results = [{"stage": "page_load", **latency_stats(loads, cards), **memory}]
+    results += [{"stage": f"{EXTRACT_STAGE}[{mode}]", **latency_stats(t, len(rows[mode])), **memory}
+                for mode, t in timings.items()]
+    return results
+
+
+def measure_extract(args):
+    import asyncio
+    return asyncio.run(_measure_extract(args))
+
+
+def run_child(stage, csv_path, args):
+    cmd = [sys.executable, os.path.abspath(__file__), "--child", stage, csv_path or "-",
+           "--repeat", str(args.repeat), "--chunksize", str(args.chunksize)]
+    proc = subprocess.run(cmd, capture_output=True, text=True)
+    if proc.returncode:
+        # The exception line, not whatever banner the library printed after it (Playwright's install hint)
+        errors = re.findall(r"^[\w.]*(?:Error|Exception)\b.*$", proc.stderr, re.MULTILINE)
+        return [{"stage": stage, "skipped": errors[-1] if errors else f"exit status {proc.returncode}"}]
+    return json.loads(proc.stdout.strip().splitlines()[-1])
+
+
+def print_result(rows, r):
+    label = f"{rows:>9,} rows  {r['stage']:18}" if rows else f"{'fixtures':>14}  {r['stage']:18}"
+    if "skipped" in r:
+        print(f"{label} skipped: {r['skipped']}")
+        return
+    rate = f"{r['rows_per_s']:12,.0f} rows/s" if r['rows_per_s'] else ""
+    print(f"{label} p50 {r['p50_ms']:9.2f} ms  p90 {r['p90_ms']:9.2f}  p99 {r['p99_ms']:9.2f}  "
+          f"{rate}  peak {r['peak_mb']:6.0f} MB (+{r['delta_mb']:.0f})")
+
+
+def compare(results, baseline_path):
+    """p50 change per (stage, size) against an earlier --json run."""
+    with open(baseline_path, encoding='utf-8') as f:
+        before = {(r['stage'], r.get('size')): r for r in json.load(f)['results'] if 'p50_ms' in r}
+    print(f"\nChange against {baseline_path} (p50 latency, peak memory):")
+    for r in results:
+        old = before.get((r['stage'], r.get('size')))
+        if old and 'p50_ms' in r:
+            print(f"{r.get('size') or 0:>9,} rows  {r['stage']:18} {r['p50_ms'] / old['p50_ms'] - 1:+7.1%}  "
+                  f"{r['peak_mb'] - old['peak_mb']:+7.0f} MB")
+
+
+def git_revision():
+    try:
+        return subprocess.run(["git", "rev-parse", "--short", "HEAD"], cwd=BENCH_DIR, capture_output=True,
+                              text=True, check=True).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return None
+
+
+def main(args):
+    from synthetic import generate_flights
+
+    results = []
+    csv_stages = [s for s in args.stages if s in STAGES]
+    with tempfile.TemporaryDirectory() as workdir:
+        for n in args.sizes if csv_stages else []:
+            csv_path = os.path.join(workdir, f"flights_{n}.csv")
+            generate_flights(n, currency=args.currency).to_csv(csv_path, index=False)
+            for stage in csv_stages:
+                for r in run_child(stage, csv_path, args):
+                    results.append({**r, "size": n})
+                    print_result(n, r)
+    if EXTRACT_STAGE in args.stages:
+        for r in run_child(EXTRACT_STAGE, None, args):
+            results.append(r)
+            print_result(None, r)
+    if args.json:
+        meta = {"timestamp": datetime.now().isoformat(timespec='seconds'), "revision": git_revision(),
+                "python": platform.python_version(), "platform": platform.platform(), "cpus": os.cpu_count(),
+                "repeat": args.repeat, "chunksize": args.chunksize}
+        with open(args.json, 'w', encoding='utf-8') as f:
+            json.dump({"meta": meta, "results": results}, f, indent=2)
+        print(f"Wrote {len(results)} results to {args.json}")
+    if args.compare:
+        compare(results, args.compare)
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Run the end-to-end benchmark suite.")
+    parser.add_argument("--sizes", type=int, nargs="+", default=[100_000, 1_000_000])
+    parser.add_argument("--stages", nargs="+", default=list(STAGES) + [EXTRACT_STAGE],
+                        choices=list(STAGES) + [EXTRACT_STAGE])
+    parser.add_argument("--repeat", type=int, default=5, help="Timed runs per stage, after one warm-up")
+    parser.add_argument("--chunksize", type=int, default=200_000)
+    parser.add_argument("--currency", type=str, default="₹", help="Price prefix in the synthetic data")
+    parser.add_argument("--json", type=str, default=None, help="Write machine-readable results here")
+    parser.add_argument("--compare", type=str, default=None, help="Print the change against an earlier --json file")
+    parser.add_argument("--child", nargs=2, metavar=("STAGE", "CSV"), help=argparse.SUPPRESS)
+    args = parser.parse_args()
+    if args.child:
+        stage, csv_path = args.child
+        out = measure_extract(args) if stage == EXTRACT_STAGE else measure_stage(stage, csv_path, args)
+        print(json.dumps(out))
+        sys.exit(0)
+    main(args)
@@ -0,0 +1,67 @@
+# Synthetic flight rows in the scraper's raw output format, for benchmarks.
+# Usage: python benchmarks/synthetic.py 100000 /tmp/flights.csv
+
+import argparse
+from datetime import date, timedelta
+
+import numpy as np
+import pandas as pd
+
+AIRLINES = ["IndiGo", "Air India", "Vistara", "SpiceJet", "Akasa Air", "Air India Express",
+            "IndiGoAir India", "Emirates", "Qatar Airways", "Lufthansa"]
+STOPS = ["Nonstop", "1 stop", "2 stops"]
+VARIATIONS = ["-12% emissions", "Avg emissions", "+18% emissions", "+41% emissions"]
+
+
+def _clock(minutes: np.ndarray) -> np.ndarray:
+    minutes = minutes % (24 * 60)
+    hours, mins = minutes // 60, minutes % 60
+    suffix = np.where(hours < 12, "AM", "PM")
+    hours12 = np.where(hours % 12 == 0, 12, hours % 12)
+    return np.char.add(np.char.add(np.char.add(hours12.astype(str), ":"),
+                                   np.char.zfill(mins.astype(str), 2)), np.char.add(" ", suffix))
+
+
+def _duration(minutes: np.ndarray) -> np.ndarray:
+    hr = np.char.add((minutes // 60).astype(str), " hr")
+    with_min = np.char.add(np.char.add(hr, " "), np.char.add((minutes % 60).astype(str), " min"))
+    return np.where(minutes % 60 == 0, hr, with_min)
+
+
+def generate_flights(n: int, seed: int = 0, days: int = 30, start: date = date(2025, 7, 1),
+                     missing_rate: float = 0.03, routes=(("DEL", "BOM"),), currency: str = "₹") -> pd.DataFrame:
+    """n rows shaped like scraper output: '₹4,512' (or '$1,234') prices, '1 hr 25 min' durations, 'N/A' gaps."""
+    rng = np.random.default_rng(seed)
+    departure = rng.integers(0, 24 * 12, n) * 5
+    duration = rng.integers(13, 150, n) * 5
+    price = rng.lognormal(8.6, 0.45, n).astype(int)
+    co2 = rng.integers(60, 260, n)
+    route = np.array([f"{o}|{d}" for o, d in routes])[rng.integers(0, len(routes), n)]
+    df = pd.DataFrame({
+        "Departure Time": _clock(departure),
+        "Arrival Time": _clock(departure + duration),
+        "Airline Company": np.array(AIRLINES)[rng.integers(0, len(AIRLINES), n)],
+        "Flight Duration": _duration(duration),
+        "Stops": np.array(STOPS)[rng.choice(len(STOPS), n, p=[0.55, 0.35, 0.10])],
+        "Price": np.char.add(currency, np.char.mod("%s", [f"{p:,}" for p in price])),
+        "co2 emissions": np.char.add(co2.astype(str), " kg CO2e"),
+        "emissions variation": np.array(VARIATIONS)[rng.integers(0, len(VARIATIONS), n)],
+        "Date": [(start + timedelta(days=int(d))).isoformat() for d in rng.integers(0, days, n)],
+        "Origin": [r.split("|")[0] for r in route],
+        "Destination": [r.split("|")[1] for r in route],
+    })
+    # Google Flights leaves cards without a price or emissions estimate
+    for column in ("Price", "co2 emissions", "Flight Duration"):
+        df.loc[rng.random(n) < missing_rate, column] = "N/A"
+    return df
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Write a synthetic scraper-format CSV.")
+    parser.add_argument("rows", type=int)
+    parser.add_argument("output", type=str)
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--currency", type=str, default="₹", help="Price prefix, e.g. $")
+    args = parser.parse_args()
+    generate_flights(args.rows, args.seed, currency=args.currency).to_csv(args.output, index=False)
+    print(f"Wrote {args.rows:,} rows to {args.output}")
@@ -5,6 +5,8 @@ from playwright.async_api import async_playwright
 from typing import List, Dict, Optional
 import pandas as pd
 from datetime import datetime, timedelta
+import os
+import tempfile
 
 
 class FlightURLBuilder:
@@ -77,38 +79,65 @@ async def scrape_flight_info(flight) -> Dict[str, str]:
         "emissions variation": emissions_variation
     }
 
+def clean_text(value):
+    if isinstance(value, str):
+        return value.replace('Â', '').replace(' ', ' ').replace('Ã', '').replace('¶', '').strip()
+    return value
+
+def clean_row(row: Dict[str, str]) -> Dict[str, str]:
+    return {k: clean_text(v) for k, v in row.items()}
+
 def clean_csv(filename: str):
     """Clean unwanted characters from the saved CSV file."""
     data = pd.read_csv(filename, encoding="utf-8")
-    
-    def clean_text(value):
-        if isinstance(value, str):
-            return value.replace('Â', '').replace(' ', ' ').replace('Ã', '').replace('¶', '').strip()
-        return value
-
-    cleaned_data = data.applymap(clean_text)
+    cleaned_data = data.apply(lambda col: col.map(clean_text))
     cleaned_file_path = f"{filename}"
     cleaned_data.to_csv(cleaned_file_path, index=False)
     print(f"Cleaned CSV saved to: {cleaned_file_path}")
 
+class StreamingCSVWriter:
+    """Write cleaned rows to a temp file as they arrive and rename it over the target when done. Each
+    writer gets its own temp file, so two writers aimed at the same filename never interleave rows."""
+
+    def __init__(self, filename: str):
+        self.filename = filename
+        self.tmp_path = None
+        self._file = None
+        self._writer = None
+
+    def write_rows(self, rows: List[Dict[str, str]]) -> None:
+        if not rows:
+            return
+        if self._writer is None:
+            fd, self.tmp_path = tempfile.mkstemp(dir=os.path.dirname(os.path.abspath(self.filename)),
+                                                 prefix=f".{os.path.basename(self.filename)}.", suffix=".tmp")
+            self._file = os.fdopen(fd, 'w', newline='', encoding='utf-8')
+            self._writer = csv.DictWriter(self._file, fieldnames=list(rows[0].keys()))
+            self._writer.writeheader()
+        self._writer.writerows(clean_row(row) for row in rows)
+        self._file.flush()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, *exc):
+        if self._file is None:
+            return
+        self._file.close()
+        if exc_type is None:
+            os.replace(self.tmp_path, self.filename)
+        else:
+            os.remove(self.tmp_path)
+
 def save_to_csv(data: List[Dict[str, str]], filename: str = "flight_data.csv") -> None:
     """Save flight data to a CSV file."""
     if not data:
         return
-    
-    headers = list(data[0].keys())
-    
-    with open(filename, 'w', newline='', encoding='utf-8') as csvfile:
-        writer = csv.DictWriter(csvfile, fieldnames=headers)
-        writer.writeheader()
-        writer.writerows(data)
-    
-    # Clean the saved CSV
-    clean_csv(filename)
+    with StreamingCSVWriter(filename) as writer:
+        writer.write_rows(data)
 
 def append_to_csv(data: List[Dict[str, str]], filename: str = "flight_data.csv") -> None:
     """Append flight data to a CSV file, creating it if it doesn't exist."""
-    import os
     if not data:
         return
     headers = list(data[0].keys())
@@ -117,10 +146,10 @@ def append_to_csv(data: List[Dict[str, str]], filename: str = "flight_data.csv")
         writer = csv.DictWriter(csvfile, fieldnames=headers)
         if not file_exists:
             writer.writeheader()
-        writer.writerows(data)
-    clean_csv(filename)
+        # Rows are cleaned on the way in, so the file never has to be re-read
+        writer.writerows(clean_row(row) for row in data)
 
-async def scrape_flight_data(one_way_url, append=False, filename="flight_data.csv"):
+async def collect_flight_data(one_way_url) -> List[Dict[str, str]]:
     flight_data = []
     playwright, browser, page = await setup_browser()
     try:
@@ -130,25 +159,29 @@ async def scrape_flight_data(one_way_url, append=False, filename="flight_data.cs
         for flight in flights:
             flight_info = await scrape_flight_info(flight)
             flight_data.append(flight_info)
-        if append:
-            append_to_csv(flight_data, filename)
-        else:
-            save_to_csv(flight_data, filename)
+        return flight_data
     finally:
         await browser.close()
         await playwright.stop()
 
+async def scrape_flight_data(one_way_url, append=False, filename="flight_data.csv"):
+    flight_data = await collect_flight_data(one_way_url)
+    if append:
+        append_to_csv(flight_data, filename)
+    else:
+        save_to_csv(flight_data, filename)
+
 async def scrape_flights_date_range(origin, destination, start_date, end_date, filename="flight_data.csv"):
     current = datetime.strptime(start_date, "%Y-%m-%d")
     end = datetime.strptime(end_date, "%Y-%m-%d")
-    first = True
-    while current <= end:
-        date_str = current.strftime("%Y-%m-%d")
-        url = FlightURLBuilder.build_url(origin, destination, date_str)
-        print(f"Scraping {origin} to {destination} for {date_str}")
-        await scrape_flight_data(url, append=not first, filename=filename)
-        first = False
-        current += timedelta(days=1)
+    # One streaming writer for the whole range: each day is appended once, the file is renamed into place at the end
+    with StreamingCSVWriter(filename) as writer:
+        while current <= end:
+            date_str = current.strftime("%Y-%m-%d")
+            url = FlightURLBuilder.build_url(origin, destination, date_str)
+            print(f"Scraping {origin} to {destination} for {date_str}")
+            writer.write_rows(await collect_flight_data(url))
+            current += timedelta(days=1)
     print(f"Scraping complete. All data in {filename}")
 
 if __name__ == "__main__":
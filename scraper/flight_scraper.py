@@ -10,6 +10,14 @@ import pandas as pd
 from datetime import datetime, timedelta
 import os
 import argparse
+import inspect
+import json
+import tempfile
+import time
+from urllib.parse import urlparse
+from contextlib import AsyncExitStack, asynccontextmanager
+from flight_store import write_store
+from scrape_cache import ScrapeCache
 
 import asyncio
 import csv
@@ -59,6 +67,143 @@ async def setup_browser():
     return p, browser, page
 
 
+class HostRateLimiter:
+    """Spaces out navigations to the same host to at most `per_second` per second (0 = unlimited)."""
+
+    def __init__(self, per_second: float = 0):
+        self.interval = 1 / per_second if per_second else 0
+        self._next_slot: Dict[str, float] = {}
+        self._lock = asyncio.Lock()
+
+    async def wait(self, url: str) -> None:
+        if not self.interval:
+            return
+        host = urlparse(url).netloc
+        loop = asyncio.get_running_loop()
+        async with self._lock:
+            now = loop.time()
+            slot = max(now, self._next_slot.get(host, 0))
+            self._next_slot[host] = slot + self.interval
+        await asyncio.sleep(slot - now)
+
+
+# Lean mode aborts these: they are never read by the extractors
+BLOCKED_RESOURCE_TYPES = {"image", "font", "media"}
+BLOCKED_URL_PARTS = (
+    "google-analytics.com", "googletagmanager.com", "doubleclick.net",
+    "play.google.com/log", "/gen_204", "/log?format=json",
+)
+
+
+class PageTraffic:
+    """Network counters for one pooled page, reset before each navigation."""
+
+    def __init__(self):
+        self.reset()
+
+    def reset(self) -> None:
+        self.requests = 0
+        self.bytes = 0
+        self.blocked = 0
+
+
+class BrowserPool:
+    """One long-lived Chromium instance with a fixed pool of reusable pages.
+
+    lean=True aborts images, fonts, media and analytics beacons. user_data_dir keeps a persistent
+    profile (cookies, consent state) between runs. Timeouts are in milliseconds; None keeps Playwright's.
+    """
+
+    def __init__(self, concurrency: int = 4, rate_limit: float = 0, lean: bool = False,
+                 user_data_dir: Optional[str] = None, nav_timeout_ms: Optional[float] = None,
+                 results_timeout_ms: Optional[float] = None):
+        self.concurrency = max(1, concurrency)
+        self.rate_limiter = HostRateLimiter(rate_limit)
+        self.lean = lean
+        self.user_data_dir = user_data_dir
+        self.nav_timeout_ms = nav_timeout_ms
+        self.results_timeout_ms = results_timeout_ms
+        self.traffic: Dict[object, PageTraffic] = {}
+        self._playwright = None
+        self._browser = None
+        self._context = None
+        self._pages: Optional[asyncio.Queue] = None
+
+    async def start(self) -> "BrowserPool":
+        self._playwright = await async_playwright().start()
+        if self.user_data_dir:
+            self._context = await self._playwright.chromium.launch_persistent_context(self.user_data_dir, headless=True)
+        else:
+            self._browser = await self._playwright.chromium.launch(headless=True)
+            self._context = await self._browser.new_context()
+        if self.lean:
+            await self._context.route("**/*", self._route_lean)
+        self._pages = asyncio.Queue()
+        for _ in range(self.concurrency):
+            self._pages.put_nowait(await self._new_page())
+        return self
+
+    async def close(self) -> None:
+        if self._browser:
+            await self._browser.close()
+        elif self._context:
+            await self._context.close()
+        if self._playwright:
+            await self._playwright.stop()
+        self._browser = self._playwright = self._context = None
+
+    @property
+    def healthy(self) -> bool:
+        """False once the browser has crashed or been closed; a long-lived pool should then be restarted."""
+        if self._context is None:
+            return False
+        return self._browser is None or self._browser.is_connected()
+
+    async def __aenter__(self) -> "BrowserPool":
+        return await self.start()
+
+    async def __aexit__(self, *exc) -> None:
+        await self.close()
+
+    async def _new_page(self):
+        page = await self._context.new_page()
+        traffic = self.traffic[page] = PageTraffic()
+
+        async def on_finished(request):
+            traffic.requests += 1
+            try:
+                sizes = await request.sizes()
+                traffic.bytes += sizes["responseBodySize"] + sizes["responseHeadersSize"]
+            except Exception:  # page navigated away before sizes were available
+                pass
+
+        page.on("requestfinished", on_finished)
+        return page
+
+    async def _route_lean(self, route) -> None:
+        request = route.request
+        if request.resource_type in BLOCKED_RESOURCE_TYPES or any(p in request.url for p in BLOCKED_URL_PARTS):
+            try:
+                self.traffic[request.frame.page].blocked += 1
+            except Exception:  # service worker or detached frame
+                pass
+            await route.abort()
+        else:
+            await route.continue_()
+
+    @asynccontextmanager
+    async def page(self):
+        """Borrow a page from the pool, replacing it if it was closed while in use."""
+        page = await self._pages.get()
+        try:
+            yield page
+        finally:
+            if page.is_closed():
+                self.traffic.pop(page, None)
+                page = await self._new_page()
+            self._pages.put_nowait(page)
+
+
 async def extract_flight_element_text(flight, selector: str, aria_label: Optional[str] = None) -> str:
     """Extract text from a flight element using selector and optional aria-label."""
     if aria_label:
@@ -68,59 +213,133 @@ async def extract_flight_element_text(flight, selector: str, aria_label: Optiona
     return await element.inner_text() if element else "N/A"
 
 
+# Output column -> selector inside a ".pIav2d" result card
+FLIGHT_FIELDS = [
+    ("Departure Time", 'span[aria-label*="Departure time"]'),
+    ("Arrival Time", 'span[aria-label*="Arrival time"]'),
+    ("Airline Company", ".sSHqwe"),
+    ("Flight Duration", "div.gvkrdb"),
+    ("Stops", "div.EfT7Ae span.ogfYpf"),
+    ("Price", "div.FpEdX span"),
+    ("co2 emissions", "div.O7CXue"),
+    ("emissions variation", "div.N6PNV"),
+]
+
+# Runs in the page: extracts every field of every card in one round-trip
+EXTRACT_ALL_FLIGHTS_JS = """
+(cards, fields) => cards.map(card => {
+    const row = {};
+    for (const [name, selector] of fields) {
+        const el = card.querySelector(selector);
+        row[name] = el ? el.innerText : "N/A";
+    }
+    return row;
+})
+"""
+
+
 async def scrape_flight_info(flight) -> Dict[str, str]:
     """Extract all relevant information from a single flight element."""
-    departure_time = await extract_flight_element_text(flight, 'span', "Departure time")
-    arrival_time =  await extract_flight_element_text(flight, 'span', "Arrival time")
-    airline = await extract_flight_element_text(flight, ".sSHqwe")
-    duration = await extract_flight_element_text(flight, "div.gvkrdb")
-    stops =  await extract_flight_element_text(flight, "div.EfT7Ae span.ogfYpf")
-    price =  await extract_flight_element_text(flight, "div.FpEdX span")
-    co2_emissions =  await extract_flight_element_text(flight, "div.O7CXue")
-    emissions_variation =  await extract_flight_element_text(flight, "div.N6PNV")
-    return {
-        "Departure Time": departure_time,
-        "Arrival Time": arrival_time,
-        "Airline Company": airline,
-        "Flight Duration": duration,
-        "Stops": stops,
-        "Price": price,
-        "co2 emissions": co2_emissions,
-        "emissions variation": emissions_variation
-    }
+    return {name: await extract_flight_element_text(flight, selector) for name, selector in FLIGHT_FIELDS}
+
+
+async def extract_flights_batch(page) -> List[Dict[str, str]]:
+    """Extract all flight cards on the page with a single in-page evaluation."""
+    return await page.eval_on_selector_all(".pIav2d", EXTRACT_ALL_FLIGHTS_JS, FLIGHT_FIELDS)
+
+
+async def extract_flights_per_card(page) -> List[Dict[str, str]]:
+    """Extract flight cards one field at a time (one IPC round-trip per selector)."""
+    flights = await page.query_selector_all(".pIav2d")
+    return [await scrape_flight_info(flight) for flight in flights]
+
+
+EXTRACTORS = {
+    "batch": extract_flights_batch,
+    "per-card": extract_flights_per_card,
+}
+
+def clean_text(value):
+    """Strip mis-decoded characters and narrow spaces that Google Flights text picks up."""
+    if isinstance(value, str):
+        return value.replace('Â', '').replace(' ', ' ').replace('Ã', '').replace('¶', '').strip()
+    return value
 
 def clean_csv(filename: str):
-    """Clean unwanted characters from the saved CSV file."""
+    """Clean unwanted characters from an already saved CSV file (rows written by save_to_csv are clean)."""
     data = pd.read_csv(filename, encoding="utf-8")
-    
-    def clean_text(value):
-        if isinstance(value, str):
-            return value.replace('Â', '').replace(' ', ' ').replace('Ã', '').replace('¶', '').strip()
-        return value
-
     # Use DataFrame.map for each column instead of applymap
     cleaned_data = data.apply(lambda col: col.map(clean_text))
     cleaned_file_path = f"{filename}"
     cleaned_data.to_csv(cleaned_file_path, index=False)
     print(f"Cleaned CSV saved to: {cleaned_file_path}")
 
-def save_to_csv(data: List[Dict[str, str]], filename: str = "flight_data.csv") -> None:
-    """Save flight data to a CSV file in the csv_output folder."""
-    if not data:
-        return
-    # Ensure output is always in csv_output folder
+def resolve_output_path(filename: str) -> str:
+    """Relative filenames always land in the csv_output folder next to this script."""
     output_dir = os.path.join(os.path.dirname(__file__), 'csv_output')
     os.makedirs(output_dir, exist_ok=True)
-    # If filename is not an absolute path, join with csv_output
     if not os.path.isabs(filename):
         filename = os.path.join(output_dir, os.path.basename(filename))
-    headers = list(data[0].keys())
-    with open(filename, 'w', newline='', encoding='utf-8') as csvfile:
-        writer = csv.DictWriter(csvfile, fieldnames=headers)
-        writer.writeheader()
-        writer.writerows(data)
-    # Clean the saved CSV
-    clean_csv(filename)
+    return filename
+
+class StreamingCSVWriter:
+    """Append rows to a temp file as they are produced, then atomically rename it into place.
+
+    Readers never see a half-written CSV, and nothing is re-read: total cost is linear in rows written.
+    If no rows were written the target file is left untouched. Each writer gets its own temp file, so
+    two writers aimed at the same filename never interleave rows; the last to commit wins.
+    """
+
+    def __init__(self, filename: str):
+        self.filename = resolve_output_path(filename)
+        self.tmp_path = None
+        self.rows_written = 0
+        self._file = None
+        self._writer = None
+
+    def write_rows(self, rows: List[Dict[str, str]]) -> None:
+        if not rows:
+            return
+        if self._writer is None:
+            fd, self.tmp_path = tempfile.mkstemp(dir=os.path.dirname(self.filename),
+                                                 prefix=f".{os.path.basename(self.filename)}.", suffix=".tmp")
+            self._file = os.fdopen(fd, 'w', newline='', encoding='utf-8')
+            self._writer = csv.DictWriter(self._file, fieldnames=list(rows[0].keys()))
+            self._writer.writeheader()
+        self._writer.writerows(rows)
+        self._file.flush()
+        self.rows_written += len(rows)
+
+    def commit(self) -> None:
+        if self._file is None:
+            return
+        self._file.close()
+        os.replace(self.tmp_path, self.filename)
+        self._file = self._writer = None
+        print(f"Saved {self.rows_written} rows to: {self.filename}")
+
+    def abort(self) -> None:
+        if self._file is None:
+            return
+        self._file.close()
+        os.remove(self.tmp_path)
+        self._file = self._writer = None
+
+    def __enter__(self) -> "StreamingCSVWriter":
+        return self
+
+    def __exit__(self, exc_type, *exc) -> None:
+        if exc_type is None:
+            self.commit()
+        else:
+            self.abort()
+
+def save_to_csv(data: List[Dict[str, str]], filename: str = "flight_data.csv") -> None:
+    """Save flight data to a CSV file in the csv_output folder."""
+    if not data:
+        return
+    with StreamingCSVWriter(filename) as writer:
+        writer.write_rows([{k: clean_text(v) for k, v in row.items()} for row in data])
 
 async def scrape_flight_data(one_way_url):
     flight_data = []
@@ -146,56 +365,279 @@ async def scrape_flight_data(one_way_url):
         await browser.close()
         await playwright.stop()
 
-# Add missing scrape_flights_date_range
-async def scrape_flights_date_range(origin, destination, start_date, end_date, filename):
-    """Scrape flights for each date in the range and append to CSV."""
+async def scrape_page(page, one_way_url, extraction: str = "batch", pool: Optional[BrowserPool] = None,
+                      metrics: Optional[Dict] = None) -> List[Dict[str, str]]:
+    """Load a results page and extract every flight card on it.
+
+    With a pool, its timeouts apply and `metrics` receives goto/results/extract milliseconds and
+    the requests, bytes and blocked-request counts for this navigation.
+    """
+    traffic = pool.traffic.get(page) if pool else None
+    if traffic:
+        traffic.reset()
+    t0 = time.perf_counter()
+    if pool and pool.lean:
+        # The result cards are all we need; don't wait for every subresource to finish
+        await page.goto(one_way_url, wait_until="domcontentloaded", timeout=pool.nav_timeout_ms)
+    else:
+        await page.goto(one_way_url, timeout=pool.nav_timeout_ms if pool else None)
+    t1 = time.perf_counter()
+    await page.wait_for_selector(".pIav2d", timeout=pool.results_timeout_ms if pool else None)
+    t2 = time.perf_counter()
+    rows = await EXTRACTORS[extraction](page)
+    if metrics is not None:
+        metrics.update({
+            "goto_ms": round((t1 - t0) * 1000, 1),
+            "results_ms": round((t2 - t1) * 1000, 1),
+            "extract_ms": round((time.perf_counter() - t2) * 1000, 1),
+        })
+        if traffic:
+            metrics.update({"requests": traffic.requests, "bytes": traffic.bytes, "blocked": traffic.blocked})
+    return rows
+
+async def scrape_date(pool: BrowserPool, origin, destination, date_str, retries: int = 2,
+                      extraction: str = "batch", on_progress=None) -> List[Dict[str, str]]:
+    """Scrape a single date on a pooled page, retrying with backoff on failure."""
+    url = FlightURLBuilder.build_url(origin, destination, date_str)
+    report = on_progress or (lambda event: None)
+    started = None
+    for attempt in range(retries + 1):
+        try:
+            async with pool.page() as page:
+                if started is None:
+                    started = time.perf_counter()
+                    report({"date": date_str, "status": "running"})
+                await pool.rate_limiter.wait(url)
+                print(f"Scraping {origin} to {destination} for {date_str}...")
+                metrics = {}
+                data = await scrape_page(page, url, extraction, pool, metrics)
+            # Normalize text as rows are produced so the CSV never needs a cleaning pass
+            scraped_at = datetime.now().isoformat(timespec='seconds')
+            rows = [{**{k: clean_text(v) for k, v in row.items()}, 'Date': date_str,
+                     'Origin': origin, 'Destination': destination, 'Scraped At': scraped_at} for row in data]
+            print(f"  {date_str}: {len(rows)} flights " + " ".join(f"{k}={v}" for k, v in metrics.items()))
+            report({"date": date_str, "status": "done", "rows": len(rows), "attempts": attempt + 1,
+                    "seconds": round(time.perf_counter() - started, 3), **metrics})
+            return rows
+        except Exception as e:
+            if attempt == retries:
+                print(f"Giving up on {date_str} after {retries + 1} attempts: {e}")
+                report({"date": date_str, "status": "failed", "error": str(e), "attempts": attempt + 1,
+                        "seconds": round(time.perf_counter() - (started or time.perf_counter()), 3)})
+                return None
+            print(f"Retrying {date_str} (attempt {attempt + 2}/{retries + 1}): {e}")
+            await asyncio.sleep(2 ** attempt)
+
+async def _call(callback, *args):
+    """Call a callback that may be a plain function or return an awaitable."""
+    result = callback(*args)
+    if inspect.isawaitable(result):
+        await result
+
+def print_progress(event: Dict) -> None:
+    """--progress-json: one machine-readable line per date event, parsed by the backend's job runner."""
+    print("PROGRESS " + json.dumps(event), flush=True)
+
+def print_rows(date_str: str, rows: List[Dict[str, str]]) -> None:
+    """--emit-rows: one ROWS line per finished date carrying its rows, for live updates in the backend."""
+    print("ROWS " + json.dumps({"date": date_str, "rows": rows}), flush=True)
+
+async def scrape_flights_date_range(origin, destination, start_date, end_date, filename, concurrency=4, retries=2,
+                                    extraction="batch", store_dir=None, on_progress=None,
+                                    cache_ttl_hours=6, cache_dir="csv_output/cache", pool=None, browser_options=None,
+                                    on_rows=None):
+    """Scrape every date in the range concurrently on one shared browser and save to CSV in date order.
+
+    Days scraped within the last cache_ttl_hours are read back from cache_dir instead (0 disables the cache).
+    Pass a started BrowserPool to share one browser (and its concurrency limit) across several ranges;
+    otherwise one is started with browser_options (lean, user_data_dir, timeouts).
+    on_rows(date_str, rows) is called in date order as each day is written, cached days included; if it
+    returns an awaitable, that is awaited before the next day. File writes run on a worker thread, so a
+    caller's event loop (the backend's) keeps serving while days are saved.
+    """
     start = datetime.strptime(start_date, "%Y-%m-%d")
     end = datetime.strptime(end_date, "%Y-%m-%d")
-    all_data = []
-    for n in range((end - start).days + 1):
-        date_str = (start + timedelta(days=n)).strftime("%Y-%m-%d")
-        url = FlightURLBuilder.build_url(origin, destination, date_str)
-        print(f"Scraping {origin} to {destination} for {date_str}...")
-        data = await scrape_flight_data_collect(url)
-        for row in data:
-            row['Date'] = date_str
-        all_data.extend(data)
-    save_to_csv(all_data, filename)
+    dates = [(start + timedelta(days=n)).strftime("%Y-%m-%d") for n in range((end - start).days + 1)]
+    report = on_progress or (lambda event: None)
+    emit = on_rows or (lambda date_str, rows: None)
+    cache = None
+    if cache_ttl_hours:
+        if not os.path.isabs(cache_dir):
+            cache_dir = os.path.join(os.path.dirname(__file__), cache_dir)
+        cache = ScrapeCache(cache_dir, cache_ttl_hours)
+    cached = await asyncio.to_thread(lambda: {d: cache.get(origin, destination, d) for d in dates}) if cache else {}
+    stale = [d for d in dates if cached.get(d) is None]
+    if cache:
+        print(f"{len(dates) - len(stale)} of {len(dates)} day(s) fresh in cache, scraping {len(stale)}")
+    failed, scraped = [], []
+
+    def save_day(date_str, data):
+        if cache:
+            cache.put(origin, destination, date_str, data)
+        writer.write_rows(data)
+
+    with StreamingCSVWriter(filename) as writer:
+        async with AsyncExitStack() as stack:
+            # Only start a browser when something actually needs scraping
+            if stale and pool is None:
+                pool = await stack.enter_async_context(BrowserPool(concurrency, **(browser_options or {})))
+            tasks = {d: asyncio.create_task(scrape_date(pool, origin, destination, d, retries, extraction, on_progress))
+                     for d in stale}
+            # Await in date order: each day is written as soon as it and every earlier day are done
+            try:
+                for date_str in dates:
+                    if date_str not in tasks:
+                        # Days cached before these columns existed: route is known, scrape time is the file's mtime
+                        cached_at = datetime.fromtimestamp(cache.scraped_at(origin, destination, date_str))
+                        defaults = {'Origin': origin, 'Destination': destination,
+                                    'Scraped At': cached_at.isoformat(timespec='seconds')}
+                        data = [{**row, **{k: v for k, v in defaults.items() if k not in row}}
+                                for row in cached[date_str]]
+                        report({"date": date_str, "status": "done", "rows": len(data), "seconds": 0, "cached": True})
+                        await asyncio.to_thread(writer.write_rows, data)
+                        await _call(emit, date_str, data)
+                        continue
+                    data = await tasks[date_str]
+                    if data is None:
+                        failed.append(date_str)
+                        continue
+                    await asyncio.to_thread(save_day, date_str, data)
+                    await _call(emit, date_str, data)
+                    scraped.extend(data)
+            finally:
+                # On an error or cancellation (e.g. the caller's timeout), stop the days still running so they
+                # don't keep using pooled pages and reporting into a caller that has given up
+                for task in tasks.values():
+                    task.cancel()
+                await asyncio.gather(*tasks.values(), return_exceptions=True)
+        if dates and len(failed) == len(dates):
+            raise RuntimeError(f"Scraping failed for every date from {start_date} to {end_date}")
+    if failed:
+        print(f"No data for: {', '.join(failed)}")
+    if store_dir:
+        if not os.path.isabs(store_dir):
+            store_dir = os.path.join(os.path.dirname(__file__), store_dir)
+        # Cached days were stored when they were scraped; only fresh rows need writing
+        written = await asyncio.to_thread(write_store, scraped, store_dir, origin, destination)
+        print(f"Wrote {len(written)} Parquet partition(s) to {store_dir}")
+
+def load_manifest(path: str) -> List[Dict[str, str]]:
+    """Read routes to scrape from JSON ({"routes": [...]}) or CSV (origin,destination,start_date,end_date).
+
+    A JSON route may list several "origins"/"destinations"; every pair (except X to X) is scraped.
+    """
+    if path.lower().endswith(".csv"):
+        with open(path, newline='', encoding='utf-8') as f:
+            entries = list(csv.DictReader(f))
+    else:
+        with open(path, encoding='utf-8') as f:
+            entries = json.load(f)["routes"]
+    routes = []
+    for entry in entries:
+        origins = entry.get("origins") or [entry["origin"]]
+        destinations = entry.get("destinations") or [entry["destination"]]
+        for o in origins:
+            for d in destinations:
+                if o != d:
+                    routes.append({"origin": o.strip().upper(), "destination": d.strip().upper(),
+                                   "start_date": entry["start_date"], "end_date": entry["end_date"]})
+    return routes
+
+def route_filename(output_dir: str, origin: str, destination: str) -> str:
+    return os.path.join(output_dir, f"{origin}-{destination}.csv")
+
+async def scrape_batch(routes: List[Dict[str, str]], output_dir="csv_output/routes", concurrency=4, retries=2,
+                       extraction="batch", rate_limit=1.0, store_dir=None, on_progress=None, cache_ttl_hours=6,
+                       browser_options=None):
+    """Scrape many routes on one browser pool and write one CSV partition per route.
+
+    `concurrency` bounds pages open across all routes; `rate_limit` caps navigations per second per host.
+    Returns {"ORIGIN-DEST": error or None}.
+    """
+    if not os.path.isabs(output_dir):
+        output_dir = os.path.join(os.path.dirname(__file__), output_dir)
+    os.makedirs(output_dir, exist_ok=True)
+
+    async def run_route(pool, route):
+        name = f"{route['origin']}-{route['destination']}"
+        report = (lambda event: on_progress({**event, "route": name})) if on_progress else None
+        try:
+            await scrape_flights_date_range(route["origin"], route["destination"], route["start_date"],
+                                            route["end_date"], route_filename(output_dir, route["origin"],
+                                                                              route["destination"]),
+                                            retries=retries, extraction=extraction, store_dir=store_dir,
+                                            on_progress=report, cache_ttl_hours=cache_ttl_hours, pool=pool)
+            return name, None
+        except Exception as e:
+            print(f"Route {name} failed: {e}")
+            return name, str(e)
+
+    async with BrowserPool(concurrency, rate_limit, **(browser_options or {})) as pool:
+        results = await asyncio.gather(*(run_route(pool, route) for route in routes))
+    return dict(results)
 
 # Helper to collect data for a single day (returns list, doesn't save)
 async def scrape_flight_data_collect(one_way_url):
-    flight_data = []
     p, browser, page = await setup_browser()
     try:
-        await page.goto(one_way_url)
-        await page.wait_for_selector(".pIav2d")
-        flights = await page.query_selector_all(".pIav2d")
-        for flight in flights:
-            flight_info = await scrape_flight_info(flight)
-            flight_data.append(flight_info)
-        return flight_data
+        return await scrape_page(page, one_way_url)
     finally:
         await browser.close()
         await p.stop()
 
-if __name__ == "__main__":
-    one_way_url = FlightURLBuilder.build_url(
-        departure="SFO",
-        destination="LAX",
-        departure_date="2025-07-25"
-    )
-    print("One-way URL:", one_way_url)
-
-    # Run the scraper
-    asyncio.run(scrape_flight_data(one_way_url))
-
 # Example CLI entrypoint:
 if __name__ == "__main__":
     parser = argparse.ArgumentParser(description="Scrape flights for a date range.")
-    parser.add_argument("origin", type=str, help="Origin airport code")
-    parser.add_argument("destination", type=str, help="Destination airport code")
-    parser.add_argument("start_date", type=str, help="Start date (YYYY-MM-DD)")
-    parser.add_argument("end_date", type=str, help="End date (YYYY-MM-DD)")
+    parser.add_argument("origin", type=str, nargs="?", help="Origin airport code")
+    parser.add_argument("destination", type=str, nargs="?", help="Destination airport code")
+    parser.add_argument("start_date", type=str, nargs="?", help="Start date (YYYY-MM-DD)")
+    parser.add_argument("end_date", type=str, nargs="?", help="End date (YYYY-MM-DD)")
     parser.add_argument("--filename", type=str, default="csv_output/flight_data.csv", help="CSV output filename")
+    parser.add_argument("--concurrency", type=int, default=4, help="Number of pages scraping in parallel")
+    parser.add_argument("--retries", type=int, default=2, help="Retries per date before giving up")
+    parser.add_argument("--extraction", choices=sorted(EXTRACTORS), default="batch",
+                        help="batch: one in-page evaluation per page; per-card: one query per field")
+    parser.add_argument("--store", type=str, default=None,
+                        help="Also write a Parquet store partitioned by route/date (e.g. csv_output/store)")
+    parser.add_argument("--cache-ttl", type=float, default=6,
+                        help="Reuse days scraped within this many hours from csv_output/cache (0 disables)")
+    parser.add_argument("--progress-json", action="store_true", help="Print a PROGRESS {json} line per date event")
+    parser.add_argument("--emit-rows", action="store_true", help="Print a ROWS {json} line with each finished date's rows")
+    parser.add_argument("--manifest", type=str, default=None,
+                        help="Batch mode: JSON/CSV list of routes x date ranges (see routes.example.json)")
+    parser.add_argument("--output-dir", type=str, default="csv_output/routes",
+                        help="Batch mode: folder for the per-route CSV partitions")
+    parser.add_argument("--rate-limit", type=float, default=1.0,
+                        help="Batch mode: max page navigations per second per host (0 = unlimited)")
+    parser.add_argument("--lean", action="store_true",
+                        help="Block images, fonts, media and analytics and stop waiting once results render")
+    parser.add_argument("--user-data-dir", type=str, default=None,
+                        help="Reuse a persistent browser profile (cookies, consent) from this folder")
+    parser.add_argument("--nav-timeout", type=float, default=None, help="Page navigation timeout in seconds")
+    parser.add_argument("--results-timeout", type=float, default=None,
+                        help="Seconds to wait for the result list to appear")
     args = parser.parse_args()
-    asyncio.run(scrape_flights_date_range(args.origin, args.destination, args.start_date, args.end_date, args.filename))
\ No newline at end of file
+    on_progress = print_progress if args.progress_json else None
+    browser_options = {
+        "lean": args.lean,
+        "user_data_dir": args.user_data_dir,
+        "nav_timeout_ms": args.nav_timeout * 1000 if args.nav_timeout else None,
+        "results_timeout_ms": args.results_timeout * 1000 if args.results_timeout else None,
+    }
+    if args.manifest:
+        failures = asyncio.run(scrape_batch(load_manifest(args.manifest), args.output_dir,
+                                            concurrency=args.concurrency, retries=args.retries,
+                                            extraction=args.extraction, rate_limit=args.rate_limit,
+                                            store_dir=args.store, on_progress=on_progress,
+                                            cache_ttl_hours=args.cache_ttl, browser_options=browser_options))
+        if all(failures.values()):
+            raise SystemExit("Every route in the manifest failed")
+    else:
+        if not (args.origin and args.destination and args.start_date and args.end_date):
+            parser.error("origin, destination, start_date and end_date are required without --manifest")
+        asyncio.run(scrape_flights_date_range(args.origin, args.destination, args.start_date, args.end_date,
+                                              args.filename, concurrency=args.concurrency, retries=args.retries,
+                                              extraction=args.extraction, store_dir=args.store,
+                                              on_progress=on_progress, cache_ttl_hours=args.cache_ttl,
+                                              browser_options=browser_options,
+                                              on_rows=print_rows if args.emit_rows else None))
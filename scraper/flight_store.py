@@ -0,0 +1,86 @@
+# Columnar Parquet store for scraped flights, partitioned by route and departure date.
+# Layout: <store>/route=SFO-LAX/date=2025-07-10/part-<timestamp>.parquet
+
+import os
+import glob
+from datetime import datetime
+from typing import Dict, List
+
+import pandas as pd
+
+try:
+    import pyarrow as pa
+    import pyarrow.parquet as pq
+except ImportError:  # optional dependency: the CSV output works without it
+    pa = pq = None
+
+TEXT_COLUMNS = [
+    "Departure Time", "Arrival Time", "Airline Company", "Flight Duration",
+    "Stops", "co2 emissions", "emissions variation", "Date",
+]
+
+
+def store_schema():
+    """Typed schema: display text as strings, Price/CO2/DurationMin already parsed to numbers."""
+    return pa.schema(
+        [(name, pa.string()) for name in TEXT_COLUMNS] + [
+            ("Price", pa.float64()),
+            ("CO2", pa.float64()),
+            ("DurationMin", pa.float64()),
+            ("ScrapedAt", pa.timestamp("s")),
+        ]
+    )
+
+
+def _to_number(values: pd.Series) -> pd.Series:
+    cleaned = values.astype(str).str.replace(r"[^\d.]", "", regex=True)
+    return pd.to_numeric(cleaned, errors="coerce").astype(float)
+
+
+def _to_minutes(values: pd.Series) -> pd.Series:
+    text = values.astype(object).where(values.notna(), None).astype(str)
+    hr = text.str.extract(r"^(\d+) hr(?: (\d+) min)?").astype(float)
+    only_min = text.str.extract(r"^(\d+) min", expand=False).astype(float)
+    return (hr[0] * 60 + hr[1].fillna(0)).fillna(only_min)
+
+
+def to_store_frame(rows: List[Dict[str, str]], scraped_at: datetime) -> pd.DataFrame:
+    """Build a frame matching store_schema() from scraper rows."""
+    df = pd.DataFrame(rows)
+    for name in TEXT_COLUMNS + ["Price"]:
+        if name not in df.columns:
+            df[name] = None
+    df["CO2"] = _to_number(df["co2 emissions"])
+    df["DurationMin"] = _to_minutes(df["Flight Duration"])
+    df["Price"] = _to_number(df["Price"])
+    df["ScrapedAt"] = pd.Timestamp(scraped_at).floor("s")
+    return df[[field.name for field in store_schema()]]
+
+
+def write_store(rows: List[Dict[str, str]], store_dir: str, origin: str, destination: str,
+                scraped_at: datetime = None) -> List[str]:
+    """Write one Parquet file per departure date, replacing older parts for the same (route, date)."""
+    if pq is None:
+        print("pyarrow is not installed; skipping Parquet store")
+        return []
+    if not rows:
+        return []
+    scraped_at = scraped_at or datetime.now()
+    df = to_store_frame(rows, scraped_at)
+    schema = store_schema()
+    written = []
+    for date_str, part in df.groupby("Date", sort=True):
+        partition = os.path.join(store_dir, f"route={origin}-{destination}", f"date={date_str}")
+        os.makedirs(partition, exist_ok=True)
+        old_parts = glob.glob(os.path.join(partition, "*.parquet"))
+        path = os.path.join(partition, f"part-{scraped_at:%Y%m%dT%H%M%S}.parquet")
+        # Dot-prefixed temp files are ignored by Parquet dataset readers until the rename
+        tmp_path = os.path.join(partition, "." + os.path.basename(path) + ".tmp")
+        table = pa.Table.from_pandas(part, schema=schema, preserve_index=False)
+        pq.write_table(table, tmp_path)
+        os.replace(tmp_path, path)
+        for old in old_parts:
+            if old != path:
+                os.remove(old)
+        written.append(path)
+    return written
@@ -0,0 +1,51 @@
+# On-disk cache of scraped days so overlapping date ranges only re-scrape missing or stale days.
+# Layout: <cache_dir>/SFO-LAX/2025-07-10.csv, with the file's mtime as the scrape timestamp.
+
+import csv
+import os
+import time
+from typing import Dict, List, Optional
+
+
+class ScrapeCache:
+    """Per-(origin, destination, date) row snapshots with a freshness TTL."""
+
+    def __init__(self, cache_dir: str, ttl_hours: float = 6):
+        self.cache_dir = cache_dir
+        self.ttl_seconds = ttl_hours * 3600
+
+    def _path(self, origin: str, destination: str, date_str: str) -> str:
+        return os.path.join(self.cache_dir, f"{origin}-{destination}", f"{date_str}.csv")
+
+    def scraped_at(self, origin: str, destination: str, date_str: str) -> Optional[float]:
+        """Unix time the day was last scraped, or None if it was never cached."""
+        try:
+            return os.path.getmtime(self._path(origin, destination, date_str))
+        except OSError:
+            return None
+
+    def is_fresh(self, origin: str, destination: str, date_str: str) -> bool:
+        scraped_at = self.scraped_at(origin, destination, date_str)
+        return scraped_at is not None and time.time() - scraped_at < self.ttl_seconds
+
+    def get(self, origin: str, destination: str, date_str: str) -> Optional[List[Dict[str, str]]]:
+        """Cached rows for the day, or None when missing or older than the TTL."""
+        if not self.is_fresh(origin, destination, date_str):
+            return None
+        try:
+            with open(self._path(origin, destination, date_str), newline='', encoding='utf-8') as f:
+                return list(csv.DictReader(f))
+        except OSError:
+            return None
+
+    def put(self, origin: str, destination: str, date_str: str, rows: List[Dict[str, str]]) -> None:
+        path = self._path(origin, destination, date_str)
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        tmp_path = os.path.join(os.path.dirname(path), f".{os.path.basename(path)}.tmp")
+        with open(tmp_path, 'w', newline='', encoding='utf-8') as f:
+            # A day with no flights is still a valid answer; keep an empty file with no header
+            if rows:
+                writer = csv.DictWriter(f, fieldnames=list(rows[0].keys()))
+                writer.writeheader()
+                writer.writerows(rows)
+        os.replace(tmp_path, path)